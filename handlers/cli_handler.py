@@ -7,7 +7,9 @@ Supports text input/output and can trigger image capture for multimodal analysis
 """
 
 import os
+import re
 import sys
+import asyncio
 import time
 import platform
 from typing import Dict, Any, Optional, List
@@ -16,6 +18,8 @@ import json
 from rich.console import Console
 from rich.panel import Panel
 from rich.markdown import Markdown
+from rich.live import Live
+from rich.text import Text
 from rich.prompt import Prompt, Confirm
 
 from utils import logger
@@ -29,10 +33,39 @@ log = logger.get_logger(__name__)
 # Initialize Rich console
 console = Console()
 
-def display_welcome() -> None:
-    """Display welcome message and instructions."""
-    console.print(Panel.fit(
-        """[bold blue]Fixer AI - Technical Repair Assistant[/bold blue]
+# Persistent event loop for async Gemini calls (the SDK's async client is loop-bound)
+_LOOP: Optional[asyncio.AbstractEventLoop] = None
+
+def _run_async(coro):
+    """Run a coroutine to completion on the CLI's persistent event loop."""
+    global _LOOP
+    
+    if _LOOP is None or _LOOP.is_closed():
+        _LOOP = asyncio.new_event_loop()
+    return _LOOP.run_until_complete(coro)
+
+# Operating system, detected once (it cannot change while running)
+_OS_TYPE = platform.system().lower()
+
+# Markers that identify a PowerShell script (vs. Batch) on Windows
+_POWERSHELL_RE = re.compile(r"function|param\(|\$|Write-Host|Get-Process")
+
+def _detect_script_type(script: str) -> str:
+    """Detect the script type to use for a script on the current OS.
+    
+    Args:
+        script: The script content
+        
+    Returns:
+        "PowerShell", "Batch" or "Bash"
+    """
+    if _OS_TYPE != "windows":
+        return "Bash"
+    return "PowerShell" if _POWERSHELL_RE.search(script) else "Batch"
+
+# Constant renderables, built once at import
+_WELCOME_PANEL = Panel.fit(
+    """[bold blue]Fixer AI - Technical Repair Assistant[/bold blue]
         
 [green]Commands:[/green]
   - Type your technical issue or question
@@ -41,13 +74,21 @@ def display_welcome() -> None:
   - Use [bold]!run[/bold] to execute the last suggested script
   - Use [bold]!exit[/bold] to quit
         """,
-        title="Welcome to Fixer AI",
-        border_style="blue"
-    ))
+    title="Welcome to Fixer AI",
+    border_style="blue"
+)
+_STEPS_HEADER = "# Repair Steps\n\n"
 
-def process_command(command: str, capture_image: bool = False, use_webcam: bool = False) -> Dict[str, Any]:
+def display_welcome() -> None:
+    """Display welcome message and instructions."""
+    console.print(_WELCOME_PANEL)
+
+async def process_command(command: str, capture_image: bool = False, use_webcam: bool = False) -> Dict[str, Any]:
     """Process a CLI command and generate a response.
     
+    When an image is requested, it is captured while the multimodal model is
+    prepared in parallel.
+    
     Args:
         command: The command to process
         capture_image: Whether to capture an image
@@ -57,20 +98,23 @@ def process_command(command: str, capture_image: bool = False, use_webcam: bool
         Dict containing the structured response
     """
     try:
-        # Capture image if requested
-        image_path = None
+        # Capture image if requested, overlapping capture with model setup
+        image = None
         if capture_image:
             with console.status("[bold green]Capturing image..."):
-                image_path = vision_handler.capture_device_image(use_webcam=use_webcam)
-                if not image_path:
+                image, _ = await asyncio.gather(
+                    vision_handler.acapture_device_image(use_webcam),
+                    asyncio.to_thread(gemini_handler.warm_up_model, "diagnose/technical.txt")
+                )
+                if not image:
                     console.print("[bold red]Failed to capture image[/bold red]")
         
         # Process with Gemini
-        with console.status("[bold green]Processing with AI..."):
-            if image_path:
-                result = gemini_handler.process_multimodal(command, image_path)
-            else:
-                result = gemini_handler.process_text(command)
+        if image:
+            with console.status("[bold green]Processing with AI..."):
+                result = await gemini_handler.process_multimodal_async(command, image)
+        else:
+            result = await _stream_text(command)
         
         return result
     
@@ -78,6 +122,29 @@ def process_command(command: str, capture_image: bool = False, use_webcam: bool
         log.error(f"Error processing CLI command: {e}")
         return {"cause": "Error processing command", "steps": [f"Error: {str(e)}"], "script": ""}
 
+async def _stream_text(command: str) -> Dict[str, Any]:
+    """Process a text command, showing the model output live as it streams.
+    
+    The live view is transient; the parsed result is rendered afterwards by
+    display_result.
+    
+    Args:
+        command: The command to process
+        
+    Returns:
+        Dict containing the structured response
+    """
+    streamed = Text()
+    panel = Panel(streamed, title="Processing with AI...", border_style="dim")
+    
+    with Live(panel, console=console, transient=True, refresh_per_second=8) as live:
+        def on_chunk(chunk: str) -> None:
+            streamed.append(chunk)
+            live.refresh()
+        
+        # The CLI screens the raw request itself, before context is prepended
+        return await gemini_handler.process_text_stream(command, on_chunk, screen_input=False)
+
 def display_result(result: Dict[str, Any]) -> None:
     """Display the result in a formatted way.
     
@@ -95,17 +162,14 @@ def display_result(result: Dict[str, Any]) -> None:
         
         # Display steps
         if result.get("steps") and len(result["steps"]) > 0:
-            steps_md = "# Repair Steps\n\n"
-            for i, step in enumerate(result["steps"]):
-                steps_md += f"{i+1}. {step}\n"
+            steps_md = _STEPS_HEADER + "".join(f"{i}. {step}\n" for i, step in enumerate(result["steps"], 1))
             
             console.print(Markdown(steps_md))
         
         # Display script if available
         if result.get("script") and result["script"].strip():
             # Determine script type
-            os_type = platform.system().lower()
-            script_type = "PowerShell" if os_type == "windows" and ("function" in result["script"] or "param(" in result["script"] or "$" in result["script"] or "Write-Host" in result["script"] or "Get-Process" in result["script"]) else "Batch" if os_type == "windows" else "Bash"
+            script_type = _detect_script_type(result["script"])
                 
             console.print(Panel(
                 result["script"],
@@ -119,15 +183,134 @@ def display_result(result: Dict[str, Any]) -> None:
         log.error(f"Error displaying result: {e}")
         console.print(f"[bold red]Error displaying result: {e}[/bold red]")
 
+def _with_context(session: Dict[str, Any], request: str) -> str:
+    """Prefix a request with the stored user context, if any."""
+    if session["user_context"]:
+        return f"Previous context: {json.dumps(session['user_context'])}\nCurrent request: {request}"
+    return request
+
+def _analyze(session: Dict[str, Any], request: str, capture_image: bool = False, use_webcam: bool = False) -> None:
+    """Process a request, display the result and record the interaction.
+    
+    Args:
+        session: The CLI session state
+        request: The user's request
+        capture_image: Whether to capture an image
+        use_webcam: Whether to use webcam (if capturing image)
+    """
+    # Screen only the user's own words; the stored context prepended below can
+    # contain earlier model-generated scripts that would trip the refusal
+    if capture_image:
+        direct = gemini_handler.refusal_response(request)
+    else:
+        direct = gemini_handler.direct_response(request)
+    
+    request = _with_context(session, request)
+    if direct is not None:
+        result = direct
+    else:
+        result = _run_async(process_command(request, capture_image=capture_image, use_webcam=use_webcam))
+    
+    # Display result and store script
+    display_result(result)
+    if result.get("script"):
+        session["last_script"] = result["script"]
+    
+    # Save interaction to user context (silently)
+    if basic_tech_client.api_key and basic_tech_client.project_id:
+        basic_tech_client.add_interaction_to_context(session["user_id"], {
+            'timestamp': time.time(),
+            'request': request,
+            'cause': result.get('cause', ''),
+            'steps': result.get('steps', []),
+            'script': result.get('script', '')
+        }, silent=True)
+
+def _exit(session: Dict[str, Any]) -> bool:
+    """Handle the exit command."""
+    console.print("[bold blue]Thank you for using Fixer AI. Goodbye![/bold blue]")
+    return False
+
+def _capture(session: Dict[str, Any], use_webcam: bool) -> bool:
+    """Handle the !screenshot and !webcam commands."""
+    source = "webcam image" if use_webcam else "screenshot"
+    console.print(f"[bold blue]Please describe what I should look for in the {source}:[/bold blue]")
+    description = Prompt.ask("[bold green]Description[/bold green]")
+    _analyze(session, description, capture_image=True, use_webcam=use_webcam)
+    return True
+
+def _run_last(session: Dict[str, Any]) -> bool:
+    """Handle the !run command by executing the last suggested script."""
+    last_script = session["last_script"]
+    if not last_script:
+        console.print("[bold red]No script available to run[/bold red]")
+        return True
+    
+    # Display the script again for user review
+    console.print(Panel(
+        last_script,
+        title="Script to Execute",
+        border_style="yellow"
+    ))
+    
+    # Determine if it's a PowerShell or Bash script
+    script_type = _detect_script_type(last_script)
+    
+    # Confirm before running with script type information
+    if Confirm.ask(f"[bold red]Are you sure you want to run this {script_type} script?[/bold red]"):
+        with console.status("[bold green]Running script..."):
+            output, retry_type = script_runner.run_script(last_script, script_type.lower())
+        
+        console.print(Panel(
+            output,
+            title="Script Execution Result",
+            border_style="blue"
+        ))
+        
+        # If there's a suggested retry type and the execution failed, ask to retry
+        if retry_type and "Error" in output and Confirm.ask(f"[bold yellow]Script failed. Retry as {retry_type.capitalize()} script?[/bold yellow]"):
+            with console.status("[bold green]Retrying script with corrected type..."):
+                output, _ = script_runner.run_script(last_script, retry_type)
+            console.print(Panel(
+                output,
+                title="Retry Script Execution Result",
+                border_style="blue"
+            ))
+    
+    return True
+
+def _handle_text(session: Dict[str, Any], user_input: str) -> bool:
+    """Handle free-form text, offering image capture for issue descriptions."""
+    capture_image = use_webcam = False
+    
+    # For normal text input, check if it's a technical issue and offer image capture
+    if len(user_input) > 10 and not user_input.endswith("?"):
+        # Likely a technical issue description rather than a question
+        capture_image = Confirm.ask("\n[bold blue]Would you like to capture a screenshot or webcam image to help diagnose this issue?[/bold blue]")
+        if capture_image:
+            # Ask for capture type
+            use_webcam = Confirm.ask("[bold blue]Use webcam? (No for screenshot)[/bold blue]")
+    
+    _analyze(session, user_input, capture_image=capture_image, use_webcam=use_webcam)
+    return True
+
+# Special commands: handler followed by its extra arguments
+_COMMANDS = {
+    "!exit": (_exit,),
+    "exit": (_exit,),
+    "quit": (_exit,),
+    "q": (_exit,),
+    "!screenshot": (_capture, False),
+    "!webcam": (_capture, True),
+    "!run": (_run_last,),
+}
+
 def run() -> None:
     """Run the CLI interface in a loop."""
     try:
         # Display welcome message
         display_welcome()
         
-        # Store the last script for potential execution
-        last_script = ""
-        
         # Get or set a user ID for context storage (in a real app, this would be tied to user auth)
         user_id = os.environ.get('FIXER_USER_ID', 'did:tmp:6673b487aa82727924a89f44')
         
@@ -139,128 +322,27 @@ def run() -> None:
             # Don't show error messages, just initialize empty context
             user_context = {}
         
+        # Session state shared by the command handlers
+        session = {
+            "user_id": user_id,
+            "user_context": user_context,
+            "last_script": "",  # Last script for potential execution
+        }
+        
         # Main interaction loop
         while True:
             # Get user input
             user_input = Prompt.ask("\n[bold green]How can I help you?[/bold green]")
             
-            # Process special commands
-            if user_input.lower() in ["!exit", "exit", "quit", "q"]:
-                console.print("[bold blue]Thank you for using Fixer AI. Goodbye![/bold blue]")
-                break
-            
-            elif user_input.lower() == "!screenshot":
-                # Capture and analyze screenshot
-                console.print("[bold blue]Please describe what I should look for in the screenshot:[/bold blue]")
-                description = Prompt.ask("[bold green]Description[/bold green]")
-                # Add context to the request
-                if user_context:
-                    description = f"Previous context: {json.dumps(user_context)}\nCurrent request: {description}"
-                result = process_command(description, capture_image=True, use_webcam=False)
-                display_result(result)
-                if result.get("script"):
-                    last_script = result["script"]
-                # Save interaction to user context
-                if basic_tech_client.api_key and basic_tech_client.project_id:
-                    basic_tech_client.add_interaction_to_context(user_id, {
-                        'timestamp': time.time(),
-                        'request': description,
-                        'response': result
-                    })
-            
-            elif user_input.lower() == "!webcam":
-                # Capture and analyze webcam image
-                console.print("[bold blue]Please describe what I should look for in the webcam image:[/bold blue]")
-                description = Prompt.ask("[bold green]Description[/bold green]")
-                # Add context to the request
-                if user_context:
-                    description = f"Previous context: {json.dumps(user_context)}\nCurrent request: {description}"
-                result = process_command(description, capture_image=True, use_webcam=True)
-                display_result(result)
-                if result.get("script"):
-                    last_script = result["script"]
-                # Save interaction to user context (silently)
-                if basic_tech_client.api_key and basic_tech_client.project_id:
-                    basic_tech_client.add_interaction_to_context(user_id, {
-                        'timestamp': time.time(),
-                        'request': description,
-                        'response': result.get('response', ''),
-                        'script': result.get('script', '')
-                    }, silent=True)
-            
-            elif user_input.lower() == "!run":
-                # Execute the last script
-                if not last_script:
-                    console.print("[bold red]No script available to run[/bold red]")
-                    continue
-                
-                # Display the script again for user review
-                console.print(Panel(
-                    last_script,
-                    title="Script to Execute",
-                    border_style="yellow"
-                ))
-                
-                # Determine if it's a PowerShell or Bash script
-                os_type = platform.system().lower()
-                script_type = "PowerShell" if os_type == "windows" and ("function" in last_script or "param(" in last_script or "$" in last_script or "Write-Host" in last_script or "Get-Process" in last_script) else "Batch" if os_type == "windows" else "Bash"
-                
-                # Confirm before running with script type information
-                if Confirm.ask(f"[bold red]Are you sure you want to run this {script_type} script?[/bold red]"):
-                    with console.status("[bold green]Running script..."):
-                        output, retry_type = script_runner.run_script(last_script, script_type.lower())
-                    
-                    console.print(Panel(
-                        output,
-                        title="Script Execution Result",
-                        border_style="blue"
-                    ))
-                    
-                    # If there's a suggested retry type and the execution failed, ask to retry
-                    if retry_type and "Error" in output and Confirm.ask(f"[bold yellow]Script failed. Retry as {retry_type.capitalize()} script?[/bold yellow]"):
-                        with console.status("[bold green]Retrying script with corrected type..."):
-                            output, _ = script_runner.run_script(last_script, retry_type)
-                        console.print(Panel(
-                            output,
-                            title="Retry Script Execution Result",
-                            border_style="blue"
-                        ))
-            
+            # Dispatch special commands, otherwise treat as a request
+            command = _COMMANDS.get(user_input.lower())
+            if command:
+                keep_running = command[0](session, *command[1:])
             else:
-                # For normal text input, check if it's a technical issue and offer image capture
-                if len(user_input) > 10 and not user_input.endswith("?"):
-                    # Likely a technical issue description rather than a question
-                    capture_image = Confirm.ask("\n[bold blue]Would you like to capture a screenshot or webcam image to help diagnose this issue?[/bold blue]")
-                    
-                    if capture_image:
-                        # Ask for capture type
-                        use_webcam = Confirm.ask("[bold blue]Use webcam? (No for screenshot)[/bold blue]")
-                        
-                        # Capture the image
-                        with console.status("[bold green]Capturing image..."):
-                            # Add context to the request
-                            if user_context:
-                                user_input = f"Previous context: {json.dumps(user_context)}\nCurrent request: {user_input}"
-                            result = process_command(user_input, capture_image=True, use_webcam=use_webcam)
-                    else:
-                        # Process without image
-                        # Add context to the request
-                        if user_context:
-                            user_input = f"Previous context: {json.dumps(user_context)}\nCurrent request: {user_input}"
-                        result = process_command(user_input)
-                
-                # Display result and store script
-                display_result(result)
-                if result.get("script"):
-                    last_script = result["script"]
-                # Save interaction to user context (silently)
-                if basic_tech_client.api_key and basic_tech_client.project_id:
-                    basic_tech_client.add_interaction_to_context(user_id, {
-                        'timestamp': time.time(),
-                        'request': user_input,
-                        'response': result.get('response', ''),
-                        'script': result.get('script', '')
-                    }, silent=True)
+                keep_running = _handle_text(session, user_input)
+            
+            if not keep_running:
+                break
     
     except KeyboardInterrupt:
         console.print("\n[bold blue]CLI interface terminated.[/bold blue]")
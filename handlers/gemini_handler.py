@@ -6,35 +6,255 @@ Handles interactions with the Gemini 2.0 Flash Live model for multimodal process
 Supports text, image, and audio inputs for comprehensive troubleshooting.
 """
 
+import asyncio
+import io
 import os
 import json
-import base64
-from typing import Dict, List, Optional, Union, Any
+import re
+import datetime
+import functools
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Union, Any
 
 import google.generativeai as genai
+from google.generativeai import caching
 from PIL import Image
 
 from utils import config, logger
+from utils.response_cache import cached_response, normalize_text, response_cache
 
 # Initialize logger
 log = logger.get_logger(__name__)
 
+# orjson is an optional, faster drop-in for decoding model JSON
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Model configuration
+MODEL_NAME = "gemini-2.5-flash"  # Using the Live model for multimodal capabilities
+
+# Configured client state and one model per system prompt, built lazily
+_CONFIGURED = False
+_MODELS: Dict[str, genai.GenerativeModel] = {}
+_MODEL_LOCK = threading.Lock()
+
+# Generation settings for structured (JSON) diagnostic responses
+DIAGNOSE_GENERATION_CONFIG = {
+    "temperature": 0.2,
+    "top_p": 0.8,
+    "top_k": 40,
+    "response_mime_type": "application/json",
+}
+
+# Section headers ("Cause:", "Steps:", ...) and bullet items in free-text responses
+_SECTION_RE = re.compile(
+    r"^[ \t#*]*(?:root[ \t]+)?(cause|diagnosis|steps|instructions|script|code)[ \t*]*:[ \t*]*(.*)$",
+    re.IGNORECASE | re.MULTILINE
+)
+_BULLET_RE = re.compile(r"^[ \t]*(?:[-*]|\d+\.)[ \t]*(.+)$", re.MULTILINE)
+_SECTION_NAMES = {
+    "cause": "cause",
+    "diagnosis": "cause",
+    "steps": "steps",
+    "instructions": "steps",
+    "script": "script",
+    "code": "script",
+}
+
+# Greetings and acknowledgements that are answered without calling the model
+_TRIVIAL_INPUTS = frozenset({
+    "hi", "hello", "hey", "thanks", "thank you", "thx", "ok", "okay", "help",
+})
+
+# Requests for unambiguously destructive commands are refused without calling the model.
+# Kept narrower than script_runner's blocklist, which would also match plain
+# descriptions such as "my laptop reboots randomly".
+_DISALLOWED_RE = re.compile(
+    r"rm\s+-rf\s+/(?:\s|$|\*)"  # Delete root
+    r"|:\(\)\s*\{\s*:\|:&\s*\};:"  # Fork bomb
+    r"|\bformat\s+[a-z]:\\?(?:\s|$)"  # Format drive
+    r"|del\s+/f\s+/q\s+[a-z]:\\\*\.\*"  # Windows delete all
+    r"|remove-item\s+-recurse\s+-force\s+[a-z]:\\\*",  # PowerShell delete all
+    re.IGNORECASE
+)
+
+_GREETING_RESPONSE = {
+    "cause": "Hi! I'm Fixer, your technical repair assistant.",
+    "steps": [
+        "Describe the problem you're seeing, e.g. 'my wifi keeps disconnecting'",
+        "Include any error messages and what you were doing when it happened",
+    ],
+    "script": "",
+}
+_REFUSAL_RESPONSE = {
+    "cause": "This request involves a destructive command that Fixer will not help run.",
+    "steps": [
+        "Describe the problem you are trying to solve instead",
+        "Fixer will suggest a safe way to fix it",
+    ],
+    "script": "",
+}
+
+# Images larger than this (in either dimension) are downscaled before upload
+MAX_IMAGE_DIMENSION = 1600
+UPLOAD_JPEG_QUALITY = 80
+
+# Already-compact formats Gemini accepts as-is
+_PASSTHROUGH_MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp"}
+
+# Expiry times (epoch seconds) of models backed by an explicit context cache
+_CACHE_EXPIRY: Dict[str, float] = {}
+
+# Recreate a context cache this many seconds before its TTL runs out
+CACHE_REFRESH_MARGIN = 300
+
 # Initialize Gemini client
 def init_gemini():
-    """Initialize the Gemini client with API key from config."""
+    """Initialize the Gemini client with API key from config.
+    
+    The client is configured only once per process; later calls are no-ops.
+    """
+    global _CONFIGURED
+    
+    if _CONFIGURED:
+        return genai
+    
     api_key = config.get_config("GEMINI_API_KEY")
     if not api_key:
         raise ValueError("GEMINI_API_KEY not found in configuration")
     
     genai.configure(api_key=api_key)
+    _CONFIGURED = True
     log.info("Gemini API initialized successfully")
     
     return genai
 
-# Model configuration
-MODEL_NAME = "gemini-2.5-flash"  # Using the Live model for multimodal capabilities
+def _cache_enabled() -> bool:
+    """Check whether explicit Gemini context caching is enabled in config."""
+    return str(config.get_config("GEMINI_CACHE_ENABLED", "false")).lower() in ("1", "true", "yes")
+
+def _create_cached_model(template_path: str) -> Optional[genai.GenerativeModel]:
+    """Create a model backed by a Gemini CachedContent holding the prompt template.
+    
+    Args:
+        template_path: Prompt template path relative to the prompts directory
+        
+    Returns:
+        A GenerativeModel bound to the cached content, or None if caching failed
+        (e.g. the template is below the minimum cacheable token count)
+    """
+    try:
+        ttl_seconds = int(config.get_config("GEMINI_CACHE_TTL", "3600"))
+        cached_content = caching.CachedContent.create(
+            model=f"models/{MODEL_NAME}",
+            display_name=f"fixer-{template_path}",
+            system_instruction=_load_prompt_template(template_path),
+            ttl=datetime.timedelta(seconds=ttl_seconds),
+        )
+        _CACHE_EXPIRY[template_path] = time.time() + ttl_seconds
+        log.info(f"Created Gemini context cache {cached_content.name} for {template_path}")
+        return genai.GenerativeModel.from_cached_content(cached_content=cached_content)
+    
+    except Exception as e:
+        log.warning(f"Context caching unavailable for {template_path}, using plain model: {e}")
+        return None
+
+def _needs_refresh(template_path: str) -> bool:
+    """Check whether a cache-backed model is missing or about to expire."""
+    if template_path not in _MODELS:
+        return True
+    
+    expiry = _CACHE_EXPIRY.get(template_path)
+    return expiry is not None and time.time() > expiry - CACHE_REFRESH_MARGIN
+
+def _get_model(template_path: str) -> genai.GenerativeModel:
+    """Get the shared model that uses the given prompt template as system instruction.
+    
+    When GEMINI_CACHE_ENABLED is set, the template is stored in a Gemini context
+    cache so only the user turn is sent per request. Cached models are recreated
+    shortly before their TTL expires; the replaced cache is left to expire on its
+    own, since requests already in flight may still be using it.
+    
+    Args:
+        template_path: Prompt template path relative to the prompts directory
+        
+    Returns:
+        The cached GenerativeModel instance for that template
+    """
+    if not _needs_refresh(template_path):
+        return _MODELS[template_path]
+    
+    with _MODEL_LOCK:
+        if _needs_refresh(template_path):
+            genai_client = init_gemini()
+            model = _create_cached_model(template_path) if _cache_enabled() else None
+            if model is None:
+                _CACHE_EXPIRY.pop(template_path, None)
+                model = genai_client.GenerativeModel(
+                    MODEL_NAME,
+                    system_instruction=_load_prompt_template(template_path)
+                )
+            _MODELS[template_path] = model
+            log.info(f"Created Gemini model for {template_path}")
+    
+    return _MODELS[template_path]
+
+async def _aget_model(template_path: str) -> genai.GenerativeModel:
+    """Async variant of _get_model for use inside event loops.
+    
+    Creating or refreshing a model can make blocking context-cache API calls,
+    so that path runs in a worker thread; a ready model is returned directly.
+    
+    Args:
+        template_path: Prompt template path relative to the prompts directory
+        
+    Returns:
+        The cached GenerativeModel instance for that template
+    """
+    if not _needs_refresh(template_path):
+        return _MODELS[template_path]
+    return await asyncio.to_thread(_get_model, template_path)
+
+# Function to answer inputs that don't need the model
+def direct_response(text: str) -> Optional[Dict[str, Any]]:
+    """Return a canned response for trivial or disallowed input.
+    
+    Args:
+        text: The text input from the user
+        
+    Returns:
+        A response dict, or None if the input should go to Gemini
+    """
+    normalized = normalize_text(text)
+    # Only empty input counts as trivial by length; short reports like "dns" or
+    # "vpn" are real questions
+    if not normalized or normalized in _TRIVIAL_INPUTS:
+        log.info("Answering trivial input without calling Gemini")
+        return dict(_GREETING_RESPONSE, steps=list(_GREETING_RESPONSE["steps"]))
+    
+    return refusal_response(text)
+
+def refusal_response(text: str) -> Optional[Dict[str, Any]]:
+    """Return the canned refusal if the input asks for a destructive command.
+    
+    Args:
+        text: The text input from the user
+        
+    Returns:
+        The refusal response dict, or None if the input is allowed
+    """
+    match = _DISALLOWED_RE.search(text)
+    if match:
+        log.warning(f"Refusing request without calling Gemini: {match.group(0)}")
+        return dict(_REFUSAL_RESPONSE, steps=list(_REFUSAL_RESPONSE["steps"]))
+    
+    return None
 
 # Function to process text input
+@cached_response
 def process_text(text: str) -> Dict[str, Any]:
     """Process text input with Gemini model.
     
@@ -44,26 +264,56 @@ def process_text(text: str) -> Dict[str, Any]:
     Returns:
         Dict containing the structured response
     """
+    direct = direct_response(text)
+    if direct is not None:
+        return direct
+    
     try:
-        # Initialize Gemini
-        genai_client = init_gemini()
-        model = genai_client.GenerativeModel(MODEL_NAME)
-        
-        # Create prompt with system instructions
-        system_prompt = _load_prompt_template("diagnose/general.txt")
+        # Get the shared model (system instructions are baked in)
+        model = _get_model("diagnose/general.txt")
         
         # Generate response
         response = model.generate_content(
             contents=[
-                {"role": "user", "parts": [system_prompt]},
                 {"role": "user", "parts": [text]}
             ],
-            generation_config={
-                "temperature": 0.2,
-                "top_p": 0.8,
-                "top_k": 40,
-                "response_mime_type": "application/json",
-            }
+            generation_config=DIAGNOSE_GENERATION_CONFIG
+        )
+        
+        # Parse the response
+        result = _parse_response(response)
+        log.info(f"Successfully processed text input")
+        return result
+    
+    except Exception as e:
+        log.error(f"Error processing text input: {e}")
+        return {"error": str(e), "cause": "Unknown issue", "steps": ["Error processing your request"]}
+
+# Async variant of process_text for use inside event loops
+@cached_response
+async def process_text_async(text: str) -> Dict[str, Any]:
+    """Process text input with Gemini model without blocking the event loop.
+    
+    Args:
+        text: The text input from the user
+        
+    Returns:
+        Dict containing the structured response
+    """
+    direct = direct_response(text)
+    if direct is not None:
+        return direct
+    
+    try:
+        # Get the shared model (system instructions are baked in)
+        model = await _aget_model("diagnose/general.txt")
+        
+        # Generate response
+        response = await model.generate_content_async(
+            contents=[
+                {"role": "user", "parts": [text]}
+            ],
+            generation_config=DIAGNOSE_GENERATION_CONFIG
         )
         
         # Parse the response
@@ -75,47 +325,162 @@ def process_text(text: str) -> Dict[str, Any]:
         log.error(f"Error processing text input: {e}")
         return {"error": str(e), "cause": "Unknown issue", "steps": ["Error processing your request"]}
 
+# Function to continue a multi-turn conversation
+async def process_chat_async(history: List[Dict[str, Any]], message: str) -> Dict[str, Any]:
+    """Process a message in the context of earlier conversation turns.
+    
+    Args:
+        history: Earlier turns, oldest first, as {"role": "user"|"model", "parts": [...]}
+        message: The new user message
+        
+    Returns:
+        Dict containing the structured response
+    """
+    # Follow-up turns get the same refusal as first messages; short replies
+    # like "ok" are meaningful mid-conversation, so no greeting shortcut here
+    refusal = refusal_response(message)
+    if refusal is not None:
+        return refusal
+    
+    try:
+        # Get the shared model (system instructions are baked in)
+        model = await _aget_model("diagnose/general.txt")
+        
+        # Replay history as real chat turns and send the new message
+        chat = model.start_chat(history=history)
+        response = await chat.send_message_async(
+            message,
+            generation_config=DIAGNOSE_GENERATION_CONFIG
+        )
+        
+        # Parse the response
+        result = _parse_response(response)
+        log.info(f"Successfully processed chat message")
+        return result
+    
+    except Exception as e:
+        log.error(f"Error processing chat message: {e}")
+        return {"error": str(e), "cause": "Unknown issue", "steps": ["Error processing your request"]}
+
+# Streaming variant of process_text for interactive interfaces
+async def process_text_stream(text: str, on_chunk: Callable[[str], None], screen_input: bool = True) -> Dict[str, Any]:
+    """Process text input with Gemini model, streaming partial output.
+    
+    Args:
+        text: The text input from the user
+        on_chunk: Callback invoked with each chunk of response text as it arrives
+        screen_input: Answer trivial or disallowed input directly; pass False when
+            the caller already screened the user's raw text
+        
+    Returns:
+        Dict containing the structured response, parsed once the stream completes
+    """
+    cached = response_cache.get(text)
+    if cached is not None:
+        log.info("Serving response from cache")
+        return cached
+    
+    direct = direct_response(text) if screen_input else None
+    if direct is not None:
+        return direct
+    
+    try:
+        # Get the shared model (system instructions are baked in)
+        model = await _aget_model("diagnose/general.txt")
+        
+        # Stream the response
+        response = await model.generate_content_async(
+            contents=[
+                {"role": "user", "parts": [text]}
+            ],
+            generation_config=DIAGNOSE_GENERATION_CONFIG,
+            stream=True
+        )
+        
+        chunks = []
+        async for chunk in response:
+            chunk_text = chunk.text
+            chunks.append(chunk_text)
+            on_chunk(chunk_text)
+        
+        # Parse the complete response
+        result = _parse_text("".join(chunks))
+        response_cache.put(text, result)
+        log.info(f"Successfully processed streamed text input")
+        return result
+    
+    except Exception as e:
+        log.error(f"Error processing text input: {e}")
+        return {"error": str(e), "cause": "Unknown issue", "steps": ["Error processing your request"]}
+
 # Function to process multimodal input (text + image)
-def process_multimodal(text: str, image_path: str) -> Dict[str, Any]:
+def process_multimodal(text: str, image: Union[str, bytes]) -> Dict[str, Any]:
     """Process text and image input with Gemini model.
     
     Args:
         text: The text input from the user
-        image_path: Path to the image file
+        image: Path to the image file, or encoded image bytes
         
     Returns:
         Dict containing the structured response
     """
     try:
-        # Initialize Gemini
-        genai_client = init_gemini()
-        model = genai_client.GenerativeModel(MODEL_NAME)
-        
-        # Load image
-        image = Image.open(image_path)
+        # Get the shared model (system instructions are baked in)
+        model = _get_model("diagnose/technical.txt")
         
-        # Create prompt with system instructions
-        system_prompt = _load_prompt_template("diagnose/technical.txt")
+        # Load image as an inline blob; the file handle is closed before the call
+        image_part = _prepare_image(image)
         
         # Generate response
         response = model.generate_content(
             contents=[
-                {"role": "user", "parts": [system_prompt]},
                 {"role": "user", "parts": [
                     {"text": text},
-                    {"inline_data": {
-                        "mime_type": "image/jpeg",
-                        "data": _encode_image(image_path)
-                    }}
+                    image_part
                 ]}
             ],
-            generation_config={
-                "temperature": 0.2,
-                "top_p": 0.8,
-                "top_k": 40,
-                "response_mime_type": "application/json",
-            }
+            generation_config=DIAGNOSE_GENERATION_CONFIG
+        )
+        del image_part
+        
+        # Parse the response
+        result = _parse_response(response)
+        log.info(f"Successfully processed multimodal input")
+        return result
+    
+    except Exception as e:
+        log.error(f"Error processing multimodal input: {e}")
+        return {"error": str(e), "cause": "Unknown issue", "steps": ["Error processing your request"]}
+
+# Async variant of process_multimodal for use inside event loops
+async def process_multimodal_async(text: str, image: Union[str, bytes]) -> Dict[str, Any]:
+    """Process text and image input with Gemini model without blocking the event loop.
+    
+    Args:
+        text: The text input from the user
+        image: Path to the image file, or encoded image bytes
+        
+    Returns:
+        Dict containing the structured response
+    """
+    try:
+        # Get the shared model (system instructions are baked in)
+        model = await _aget_model("diagnose/technical.txt")
+        
+        # Load image as an inline blob; the file handle is closed before the call
+        image_part = _prepare_image(image)
+        
+        # Generate response
+        response = await model.generate_content_async(
+            contents=[
+                {"role": "user", "parts": [
+                    {"text": text},
+                    image_part
+                ]}
+            ],
+            generation_config=DIAGNOSE_GENERATION_CONFIG
         )
+        del image_part
         
         # Parse the response
         result = _parse_response(response)
@@ -126,15 +491,56 @@ def process_multimodal(text: str, image_path: str) -> Dict[str, Any]:
         log.error(f"Error processing multimodal input: {e}")
         return {"error": str(e), "cause": "Unknown issue", "steps": ["Error processing your request"]}
 
-# Helper function to encode image to base64
-def _encode_image(image_path: str) -> str:
-    """Encode image to base64 string."""
-    with open(image_path, "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode("utf-8")
+# Helper function to prepare an image for upload
+def _prepare_image(image: Union[str, bytes]) -> Dict[str, Any]:
+    """Prepare an image as a compact inline data part.
+    
+    JPEG and WebP images already within MAX_IMAGE_DIMENSION are passed
+    through as raw bytes without being decoded. Anything else (e.g. large
+    PNG screenshots) is downscaled and re-encoded as JPEG, which is
+    typically several times smaller and uses fewer image tokens.
+    
+    Args:
+        image: Path to the image file, or encoded image bytes
+        
+    Returns:
+        Dict with "mime_type" and raw "data" bytes (the SDK encodes once)
+    """
+    source = io.BytesIO(image) if isinstance(image, bytes) else image
+    with Image.open(source) as pil_image:
+        # Opening only reads the header, so size and format are cheap here
+        mime_type = _PASSTHROUGH_MIME_TYPES.get(pil_image.format)
+        if mime_type and max(pil_image.size) <= MAX_IMAGE_DIMENSION:
+            if isinstance(image, bytes):
+                return {"mime_type": mime_type, "data": image}
+            with open(image, "rb") as image_file:
+                return {"mime_type": mime_type, "data": image_file.read()}
+        
+        pil_image.thumbnail((MAX_IMAGE_DIMENSION, MAX_IMAGE_DIMENSION), Image.LANCZOS)
+        buffer = io.BytesIO()
+        pil_image.convert("RGB").save(buffer, format="JPEG", quality=UPLOAD_JPEG_QUALITY, optimize=True)
+    
+    return {"mime_type": "image/jpeg", "data": buffer.getvalue()}
+
+# Function to build a model ahead of its first request
+def warm_up_model(template_path: str = "diagnose/general.txt") -> None:
+    """Configure the client and build the shared model for a prompt template.
+    
+    Lets callers overlap model setup with other work (e.g. image capture).
+    Errors are logged and otherwise ignored; the real request will report them.
+    
+    Args:
+        template_path: Prompt template path relative to the prompts directory
+    """
+    try:
+        _get_model(template_path)
+    except Exception as e:
+        log.warning(f"Could not warm up Gemini model for {template_path}: {e}")
 
 # Helper function to load prompt template
+@functools.lru_cache(maxsize=16)
 def _load_prompt_template(template_path: str) -> str:
-    """Load prompt template from file."""
+    """Load prompt template from file (read from disk once per process)."""
     try:
         full_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "prompts", template_path)
         with open(full_path, "r") as f:
@@ -151,48 +557,59 @@ def _load_prompt_template(template_path: str) -> str:
 def _parse_response(response) -> Dict[str, Any]:
     """Parse the response from Gemini into a structured format."""
     try:
-        # Try to parse as JSON first
-        text_response = response.text
-        try:
-            parsed = json.loads(text_response)
-            return parsed
-        except json.JSONDecodeError:
-            # If not valid JSON, extract structured information from text
-            lines = text_response.split("\n")
-            cause = ""
-            steps = []
-            script = ""
-            
-            # Simple parsing logic
-            current_section = None
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
-                
-                if "cause:" in line.lower() or "diagnosis:" in line.lower():
-                    current_section = "cause"
-                    cause = line.split(":", 1)[1].strip() if ":" in line else ""
-                elif "steps:" in line.lower() or "instructions:" in line.lower():
-                    current_section = "steps"
-                elif "script:" in line.lower() or "code:" in line.lower():
-                    current_section = "script"
-                elif current_section == "cause":
-                    cause += " " + line
-                elif current_section == "steps" and line.startswith(("-", "*", "1.", "2.", "3.")):
-                    steps.append(line.lstrip("-*0123456789. "))
-                elif current_section == "script":
-                    script += line + "\n"
-            
-            return {
-                "cause": cause.strip(),
-                "steps": steps,
-                "script": script.strip()
-            }
+        return _parse_text(response.text)
     
     except Exception as e:
         log.error(f"Error parsing Gemini response: {e}")
-        return {"cause": "Unknown issue", "steps": ["Error processing the response"], "script": ""}
+        # The "error" key keeps callers from caching or recording this failure
+        return {"error": str(e), "cause": "Unknown issue", "steps": ["Error processing the response"], "script": ""}
+
+def _parse_text(text_response: str) -> Dict[str, Any]:
+    """Parse raw response text from Gemini into a structured format."""
+    try:
+        # Try to parse as JSON first
+        return _json_loads(text_response)
+    except json.JSONDecodeError:
+        # If not valid JSON, extract structured information from text
+        return _parse_sections(text_response)
+
+def _json_loads(text: str) -> Any:
+    """Decode JSON, using orjson when it is available."""
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+def _parse_sections(text: str) -> Dict[str, Any]:
+    """Extract cause, steps and script sections from a free-text response.
+    
+    Args:
+        text: The raw response text
+        
+    Returns:
+        Dict with "cause", "steps" and "script" keys
+    """
+    cause = ""
+    steps: List[str] = []
+    script_parts: List[str] = []
+    
+    headers = list(_SECTION_RE.finditer(text))
+    for index, header in enumerate(headers):
+        section = _SECTION_NAMES[header.group(1).lower()]
+        end = headers[index + 1].start() if index + 1 < len(headers) else len(text)
+        body = text[header.end():end]
+        
+        if section == "cause":
+            cause = " ".join((header.group(2) + body).split())
+        elif section == "steps":
+            steps.extend(step.strip() for step in _BULLET_RE.findall(body))
+        else:
+            script_parts.append(body.strip("\n"))
+    
+    return {
+        "cause": cause,
+        "steps": steps,
+        "script": "\n".join(script_parts).strip()
+    }
 
 # Function to generate repair script
 def generate_script(issue_description: str, os_type: str = "windows") -> str:
@@ -206,17 +623,12 @@ def generate_script(issue_description: str, os_type: str = "windows") -> str:
         String containing the generated script
     """
     try:
-        # Initialize Gemini
-        genai_client = init_gemini()
-        model = genai_client.GenerativeModel(MODEL_NAME)
-        
-        # Load script prompt template
-        script_prompt = _load_prompt_template(f"scripts/{os_type}.txt")
+        # Get the shared model for this OS's script template
+        model = _get_model(f"scripts/{os_type}.txt")
         
         # Generate script
         response = model.generate_content(
             contents=[
-                {"role": "user", "parts": [script_prompt]},
                 {"role": "user", "parts": [f"Issue: {issue_description}"]}
             ],
             generation_config={
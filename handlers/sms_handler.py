@@ -7,27 +7,50 @@ Implements a FastAPI webhook for receiving and responding to SMS messages.
 """
 
 import os
+import json
 import time
-from typing import Dict, Any, Optional
+import asyncio
+from collections import OrderedDict, deque
+from typing import Dict, Any, List, Optional
 
 import uvicorn
 from fastapi import FastAPI, Request, Form, Response
 from fastapi.responses import PlainTextResponse
+from requests.adapters import HTTPAdapter
 from twilio.rest import Client
+from twilio.http.http_client import TwilioHttpClient
 from twilio.twiml.messaging_response import MessagingResponse
 
 from utils import logger, config
+from utils.basic_tech_api import basic_tech_client
+from utils.response_cache import make_key
 from handlers import gemini_handler
 
 # Initialize logger
 log = logger.get_logger(__name__)
 
+# Redis is optional; without it responses and history stay in process memory
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
 # Initialize FastAPI app
 app = FastAPI(title="Fixer AI SMS Handler")
 
+# Shared Twilio client, reused so outbound requests keep their HTTPS connection
+_twilio_client: Optional[Client] = None
+TWILIO_POOL_SIZE = 10  # Keep-alive connections to the Twilio API per worker
+TWILIO_TIMEOUT = 10  # Seconds to wait on each Twilio API call
+
 # Initialize Twilio client
 def get_twilio_client() -> Optional[Client]:
-    """Initialize Twilio client with credentials from config."""
+    """Get the shared Twilio client, initializing it from config on first use."""
+    global _twilio_client
+    
+    if _twilio_client is not None:
+        return _twilio_client
+    
     try:
         account_sid = config.get_config("TWILIO_ACCOUNT_SID")
         auth_token = config.get_config("TWILIO_AUTH_TOKEN")
@@ -36,14 +59,194 @@ def get_twilio_client() -> Optional[Client]:
             log.error("Twilio credentials not found in configuration")
             return None
         
-        return Client(account_sid, auth_token)
+        # Pooled HTTP client keeps a persistent requests.Session across calls
+        # Size the session's connection pool for concurrent sends; no retries,
+        # since retrying a message POST could send it twice
+        http_client = TwilioHttpClient(timeout=TWILIO_TIMEOUT)
+        http_client.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=TWILIO_POOL_SIZE))
+        _twilio_client = Client(account_sid, auth_token, http_client=http_client)
+        return _twilio_client
     
     except Exception as e:
         log.error(f"Error initializing Twilio client: {e}")
         return None
 
-# Store conversation history for each phone number
-conversation_history = {}
+def _build_twiml(message: str) -> str:
+    """Build a TwiML document containing a single reply message."""
+    resp = MessagingResponse()
+    resp.message(message)
+    return str(resp)
+
+# Pre-rendered TwiML for constant replies
+_HELP_XML = _build_twiml(
+    "Fixer AI Commands:\n" +
+    "- Ask any technical question\n" +
+    "- Send 'reset' to clear conversation history\n" +
+    "- Send 'help' to see this message"
+)
+_RESET_XML = _build_twiml("Conversation history has been reset.")
+_ERROR_XML = _build_twiml("Sorry, an error occurred while processing your request.")
+
+# Conversation history limits
+MAX_CONVERSATIONS = 10_000  # Phone numbers kept before evicting the least recent
+MAX_HISTORY_MESSAGES = 10  # Chat turns (user + model) stored per phone number
+
+# Store conversation history for each phone number (least recently used first)
+conversation_history: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+def _get_conversation(phone_number: str) -> Dict[str, Any]:
+    """Get the conversation entry for a phone number, creating it if needed.
+    
+    Marks the entry as most recently used and evicts the oldest
+    conversations once MAX_CONVERSATIONS is exceeded.
+    
+    Args:
+        phone_number: The sender's phone number
+        
+    Returns:
+        Dict with the chat turn deque and lock
+    """
+    entry = conversation_history.get(phone_number)
+    if entry is None:
+        entry = {
+            "messages": deque(maxlen=MAX_HISTORY_MESSAGES),
+            "lock": asyncio.Lock(),
+        }
+        conversation_history[phone_number] = entry
+        while len(conversation_history) > MAX_CONVERSATIONS:
+            conversation_history.popitem(last=False)
+    else:
+        conversation_history.move_to_end(phone_number)
+    
+    return entry
+
+# Redis settings for sharing responses and history across workers/restarts
+REDIS_KEY_PREFIX = "fixer:sms"
+REDIS_RESPONSE_TTL = 3600  # Seconds a cached response stays valid
+REDIS_HISTORY_TTL = 86400  # Seconds of inactivity before a conversation expires
+
+_redis_client = None
+
+def get_redis_client():
+    """Get the shared async Redis client, or None if Redis is not configured."""
+    global _redis_client
+    
+    if _redis_client is None and aioredis is not None:
+        redis_url = config.get_config("REDIS_URL")
+        if redis_url:
+            _redis_client = aioredis.from_url(redis_url)
+            log.info("Using Redis for SMS response cache and conversation history")
+    
+    return _redis_client
+
+def _history_key(phone_number: str) -> str:
+    """Build the Redis key holding a phone number's chat turns."""
+    return f"{REDIS_KEY_PREFIX}:history:{phone_number}"
+
+def _response_key(message: str) -> str:
+    """Build the Redis key for a cached first-turn response."""
+    return f"{REDIS_KEY_PREFIX}:response:{gemini_handler.MODEL_NAME}:{make_key(message)}"
+
+async def _load_history(phone_number: str, conversation: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Load a phone number's chat turns, preferring Redis over local memory.
+    
+    Args:
+        phone_number: The sender's phone number
+        conversation: The in-memory conversation entry
+        
+    Returns:
+        List of chat turns, oldest first
+    """
+    redis_client = get_redis_client()
+    if redis_client is not None:
+        try:
+            turns = await redis_client.lrange(_history_key(phone_number), 0, -1)
+            return [json.loads(turn) for turn in turns]
+        except Exception as e:
+            log.warning(f"Redis unavailable, using in-memory history: {e}")
+    
+    return list(conversation["messages"])
+
+async def _save_turns(phone_number: str, conversation: Dict[str, Any], turns: List[Dict[str, Any]]) -> None:
+    """Append chat turns to local memory and, when configured, to Redis.
+    
+    Args:
+        phone_number: The sender's phone number
+        conversation: The in-memory conversation entry
+        turns: The chat turns to append
+    """
+    conversation["messages"].extend(turns)
+    
+    redis_client = get_redis_client()
+    if redis_client is not None:
+        try:
+            key = _history_key(phone_number)
+            async with redis_client.pipeline(transaction=True) as pipe:
+                pipe.rpush(key, *[json.dumps(turn) for turn in turns])
+                pipe.ltrim(key, -MAX_HISTORY_MESSAGES, -1)
+                pipe.expire(key, REDIS_HISTORY_TTL)
+                await pipe.execute()
+        except Exception as e:
+            log.warning(f"Failed to store conversation history in Redis: {e}")
+
+async def _clear_history(phone_number: str) -> None:
+    """Forget a phone number's conversation locally and in Redis.
+    
+    The entry (and its lock) is kept and cleared in place under that lock, so
+    a turn already running for the number stays serialized with later ones.
+    """
+    conversation = _get_conversation(phone_number)
+    async with conversation["lock"]:
+        conversation["messages"].clear()
+        
+        redis_client = get_redis_client()
+        if redis_client is not None:
+            try:
+                await redis_client.delete(_history_key(phone_number))
+            except Exception as e:
+                log.warning(f"Failed to clear conversation history in Redis: {e}")
+
+async def _process_first_turn(message: str) -> Dict[str, Any]:
+    """Answer a message with no prior history, using the shared Redis cache.
+    
+    Args:
+        message: The SMS message content
+        
+    Returns:
+        Dict containing the structured response
+    """
+    redis_client = get_redis_client()
+    if redis_client is None:
+        return await gemini_handler.process_text_async(message)
+    
+    key = _response_key(message)
+    try:
+        cached = await redis_client.get(key)
+        if cached is not None:
+            log.info("Serving SMS response from Redis cache")
+            return json.loads(cached)
+    except Exception as e:
+        log.warning(f"Redis unavailable, skipping response cache: {e}")
+        return await gemini_handler.process_text_async(message)
+    
+    result = await gemini_handler.process_text_async(message)
+    if "error" not in result:
+        try:
+            await redis_client.setex(key, REDIS_RESPONSE_TTL, json.dumps(result))
+        except Exception as e:
+            log.warning(f"Failed to cache SMS response in Redis: {e}")
+    
+    return result
+
+@app.on_event("startup")
+async def preload_clients():
+    """Create shared clients when the server starts (in every worker)."""
+    get_twilio_client()
+
+@app.on_event("shutdown")
+async def close_clients():
+    """Close async HTTP clients bound to this worker's event loop."""
+    await basic_tech_client.aclose()
 
 @app.get("/")
 async def root():
@@ -65,41 +268,29 @@ async def sms_webhook(request: Request, From: str = Form(...), Body: str = Form(
     try:
         log.info(f"Received SMS from {From}: {Body}")
         
-        # Initialize response
-        resp = MessagingResponse()
-        
         # Process commands
-        if Body.lower() in ["help", "commands"]:
-            resp.message(
-                "Fixer AI Commands:\n" +
-                "- Ask any technical question\n" +
-                "- Send 'reset' to clear conversation history\n" +
-                "- Send 'help' to see this message"
-            )
-        elif Body.lower() == "reset":
+        command = Body.lower()
+        if command in ["help", "commands"]:
+            return Response(content=_HELP_XML, media_type="application/xml")
+        elif command == "reset":
             # Clear conversation history for this user
-            if From in conversation_history:
-                del conversation_history[From]
-            resp.message("Conversation history has been reset.")
-        else:
-            # Process the message with Gemini
-            result = process_sms(From, Body)
-            
-            # Format the response
-            response_text = format_sms_response(result)
-            
-            # Send the response
-            resp.message(response_text)
+            await _clear_history(From)
+            return Response(content=_RESET_XML, media_type="application/xml")
+        
+        # Process the message with Gemini without blocking other webhooks
+        result = await process_sms(From, Body)
         
-        return Response(content=str(resp), media_type="application/xml")
+        # Format the response
+        response_text = format_sms_response(result)
+        
+        # Send the response
+        return Response(content=_build_twiml(response_text), media_type="application/xml")
     
     except Exception as e:
         log.error(f"Error processing SMS webhook: {e}")
-        resp = MessagingResponse()
-        resp.message("Sorry, an error occurred while processing your request.")
-        return Response(content=str(resp), media_type="application/xml")
+        return Response(content=_ERROR_XML, media_type="application/xml")
 
-def process_sms(phone_number: str, message: str) -> Dict[str, Any]:
+async def process_sms(phone_number: str, message: str) -> Dict[str, Any]:
     """Process an SMS message and generate a response.
     
     Args:
@@ -111,26 +302,26 @@ def process_sms(phone_number: str, message: str) -> Dict[str, Any]:
     """
     try:
         # Get conversation history for this user or initialize it
-        if phone_number not in conversation_history:
-            conversation_history[phone_number] = []
-        
-        # Add user message to history
-        conversation_history[phone_number].append({"role": "user", "message": message})
-        
-        # Keep only the last 5 messages to maintain context without overloading
-        if len(conversation_history[phone_number]) > 10:
-            conversation_history[phone_number] = conversation_history[phone_number][-10:]
-        
-        # Create context from history
-        context = "\n".join([f"{item['role']}: {item['message']}" for item in conversation_history[phone_number][-5:]])
+        conversation = _get_conversation(phone_number)
         
-        # Process with Gemini
-        full_message = f"Context:\n{context}\n\nCurrent question: {message}"
-        result = gemini_handler.process_text(full_message)
-        
-        # Add assistant response to history
-        response_summary = result.get("cause", "") + " " + ". ".join(result.get("steps", []))
-        conversation_history[phone_number].append({"role": "assistant", "message": response_summary})
+        # Serialize turns from the same number so history stays ordered
+        async with conversation["lock"]:
+            history = await _load_history(phone_number, conversation)
+            
+            # Process with Gemini; earlier turns are sent oldest first so the
+            # stable prefix can hit Gemini's implicit prompt cache
+            if history:
+                result = await gemini_handler.process_chat_async(history, message)
+            else:
+                result = await _process_first_turn(message)
+            
+            # Record the exchange only on success so user/model turns alternate
+            if "error" not in result:
+                response_summary = result.get("cause", "") + " " + ". ".join(result.get("steps", []))
+                await _save_turns(phone_number, conversation, [
+                    {"role": "user", "parts": [message]},
+                    {"role": "model", "parts": [response_summary]},
+                ])
         
         return result
     
@@ -191,9 +382,19 @@ def run(host: str = "0.0.0.0", port: int = 8000) -> None:
         if port_env:
             port = int(port_env)
         
-        # Start the FastAPI server
-        log.info(f"Starting SMS webhook server on {host}:{port}")
-        uvicorn.run(app, host=host, port=port)
+        # Multiple workers need Redis to share conversation history
+        workers = int(os.environ.get("WEB_CONCURRENCY", "1"))
+        if workers > 1 and not get_redis_client():
+            log.warning("Running multiple workers without REDIS_URL; conversation history will not be shared between them.")
+        
+        # Start the FastAPI server (workers > 1 requires an import string)
+        log.info(f"Starting SMS webhook server on {host}:{port} ({workers} worker(s))")
+        uvicorn.run(
+            "handlers.sms_handler:app" if workers > 1 else app,
+            host=host,
+            port=port,
+            workers=workers
+        )
     
     except Exception as e:
         log.error(f"Error starting SMS webhook server: {e}")
@@ -8,20 +8,24 @@ Supports real-time video streaming with Gemini 2.0 Flash Live API.
 """
 
 import os
+import sys
 import time
+import atexit
 import tempfile
+import threading
 import asyncio
 import base64
+import functools
 import io
 import traceback
-from pathlib import Path
+import uuid
 from typing import Optional, Tuple, Dict, Any, Union
 
 import cv2
 import numpy as np
 import PIL.Image
+import PIL.features
 import mss
-import mss.tools
 import pyaudio
 
 import google.generativeai as genai
@@ -49,16 +53,38 @@ MODEL = "gemini-2.5-flash"
 # Default video mode
 DEFAULT_VIDEO_MODE = "camera"
 
-# Initialize PyAudio
-pya = pyaudio.PyAudio()
+# Webcam settings
+WEBCAM_WIDTH = 1280
+WEBCAM_HEIGHT = 720
+WEBCAM_WARMUP_SECONDS = 0.5  # Only paid the first time a camera is opened
+WEBCAM_STALE_FRAMES = 4  # Frames skipped in case the backend ignores BUFFERSIZE
 
-# Initialize Gemini client
-api_key = config.get_config("GEMINI_API_KEY")
-if not api_key:
-    raise ValueError("GEMINI_API_KEY not found in configuration")
+# Image processing settings
+MAX_IMAGE_SIZE = 1024  # Longest side of images sent to Gemini
+RESIZE_REDUCING_GAP = 3.0  # Box-reduce by integer factors before the LANCZOS pass
+PROCESSED_QUALITY = 80
+_USE_WEBP = (config.get_config("PROCESSED_IMAGE_FORMAT", "webp").lower() == "webp"
+             and PIL.features.check("webp"))
+PROCESSED_EXTENSION = ".webp" if _USE_WEBP else ".jpg"
 
-genai.configure(api_key=api_key)
-model = genai.GenerativeModel(MODEL)
+# Minimum seconds between temp directory cleanups
+CLEANUP_INTERVAL_SECONDS = 600
+_LAST_CLEANUP = 0.0
+_CLEANUP_LOCK = threading.Lock()
+
+# Per-thread screen grabbers (mss instances must not be shared across threads)
+_MSS_LOCAL = threading.local()
+_MSS_INSTANCES = []
+_MSS_LOCK = threading.Lock()
+
+# Open webcams, kept for reuse across captures
+_CAM_CACHE: Dict[int, cv2.VideoCapture] = {}
+_CAM_LOCK = threading.Lock()
+
+# PyAudio and Gemini client, created on first use
+_pya: Optional[pyaudio.PyAudio] = None
+_model: Optional[genai.GenerativeModel] = None
+_INIT_LOCK = threading.Lock()
 
 # Chat configuration
 CHAT_CONFIG = {
@@ -76,112 +102,325 @@ CHAT_CONFIG = {
     ]
 }
 
-def capture_screenshot() -> Optional[str]:
-    """Capture a screenshot of the primary monitor.
+def get_pya() -> pyaudio.PyAudio:
+    """Get the shared PyAudio instance, initializing PortAudio on first use."""
+    global _pya
+    
+    if _pya is None:
+        with _INIT_LOCK:
+            if _pya is None:
+                _pya = pyaudio.PyAudio()
+    return _pya
+
+def get_model() -> genai.GenerativeModel:
+    """Get the shared Gemini model, configuring the client on first use.
+    
+    Raises:
+        ValueError: If GEMINI_API_KEY is not configured
+    """
+    global _model
+    
+    if _model is None:
+        with _INIT_LOCK:
+            if _model is None:
+                api_key = config.get_config("GEMINI_API_KEY")
+                if not api_key:
+                    raise ValueError("GEMINI_API_KEY not found in configuration")
+                
+                genai.configure(api_key=api_key)
+                _model = genai.GenerativeModel(MODEL)
+    return _model
+
+def _get_sct() -> "mss.base.MSSBase":
+    """Get this thread's screen grabber, creating it on first use."""
+    sct = getattr(_MSS_LOCAL, "sct", None)
+    if sct is None:
+        sct = mss.mss()
+        _MSS_LOCAL.sct = sct
+        with _MSS_LOCK:
+            _MSS_INSTANCES.append(sct)
+    return sct
+
+def close_screen_grabbers() -> None:
+    """Close all cached screen grabbers."""
+    with _MSS_LOCK:
+        for sct in _MSS_INSTANCES:
+            try:
+                sct.close()
+            except Exception as e:
+                log.error(f"Error closing screen grabber: {e}")
+        _MSS_INSTANCES.clear()
+
+atexit.register(close_screen_grabbers)
+
+def capture_screenshot(output_path: Optional[str] = None,
+                       region: Optional[Dict[str, int]] = None) -> Union[np.ndarray, str, None]:
+    """Capture a screenshot of the primary monitor or a region of the screen.
+    
+    The frame is kept in memory rather than written to disk, since it is
+    only ever resized and re-encoded by process_image.
+    
+    Args:
+        output_path: Optional path to also save the screenshot to as PNG
+        region: Optional {"left", "top", "width", "height"} area to grab
+            instead of the whole primary monitor
     
     Returns:
-        Path to the saved screenshot or None if failed
+        RGB image array of the screenshot, the saved path if output_path
+        was given, or None if failed
     """
     try:
-        timestamp = int(time.time())
-        output_path = os.path.join(TEMP_DIR, f"screenshot_{timestamp}.png")
+        sct = _get_sct()
         
-        with mss.mss() as sct:
-            # Capture the primary monitor
+        if region:
+            # Only copy the requested area out of the display server
+            monitor = {key: int(region[key]) for key in ("left", "top", "width", "height")}
+        else:
             monitor = sct.monitors[1]  # Primary monitor
-            screenshot = sct.grab(monitor)
-            
-            # Save the screenshot
-            mss.tools.to_png(screenshot.rgb, screenshot.size, output=output_path)
+        screenshot = sct.grab(monitor)
+        
+        if output_path:
+            # Fast zlib level; these files are short-lived
+            image = PIL.Image.frombytes("RGB", screenshot.size, screenshot.rgb)
+            image.save(output_path, "PNG", compress_level=1)
             
             log.info(f"Screenshot captured and saved to {output_path}")
             return output_path
+        
+        # BGRA -> RGB
+        image = np.asarray(screenshot)[..., :3][..., ::-1]
+        
+        log.info(f"Screenshot captured ({screenshot.width}x{screenshot.height})")
+        return image
     
     except Exception as e:
         log.error(f"Error capturing screenshot: {e}")
         return None
 
-def capture_webcam(camera_id: int = 0) -> Optional[str]:
+def _get_camera(camera_id: int) -> Optional[cv2.VideoCapture]:
+    """Get an open capture for a camera, opening and configuring it on first use.
+    
+    Must be called with _CAM_LOCK held.
+    
+    Args:
+        camera_id: ID of the camera to use
+        
+    Returns:
+        The cached VideoCapture, or None if the camera could not be opened
+    """
+    cap = _CAM_CACHE.get(camera_id)
+    if cap is not None and cap.isOpened():
+        return cap
+    
+    # V4L2 avoids GStreamer auto-selection on Linux
+    backend = cv2.CAP_V4L2 if sys.platform.startswith("linux") else cv2.CAP_ANY
+    cap = cv2.VideoCapture(camera_id, backend)
+    if not cap.isOpened():
+        log.error(f"Could not open camera {camera_id}")
+        cap.release()
+        return None
+    
+    # Request MJPEG (camera-side compression, full frame rate at 720p over
+    # USB), then resolution, then buffering; V4L2 needs FOURCC set first
+    cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*"MJPG"))
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, WEBCAM_WIDTH)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, WEBCAM_HEIGHT)
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    
+    # Allow camera to initialize
+    time.sleep(WEBCAM_WARMUP_SECONDS)
+    
+    _CAM_CACHE[camera_id] = cap
+    log.info(f"Opened camera {camera_id}")
+    return cap
+
+def release_cameras() -> None:
+    """Release all cached webcam captures."""
+    with _CAM_LOCK:
+        for cap in _CAM_CACHE.values():
+            cap.release()
+        _CAM_CACHE.clear()
+
+atexit.register(release_cameras)
+
+def capture_webcam(camera_id: int = 0, max_size: Optional[int] = None) -> Optional[np.ndarray]:
     """Capture an image from the webcam.
     
+    The camera is opened once and reused by later captures. The frame is
+    kept in memory rather than written to disk.
+    
     Args:
         camera_id: ID of the camera to use (default: 0 for primary camera)
+        max_size: Optional maximum dimension to downscale the frame to
         
     Returns:
-        Path to the saved webcam image or None if failed
+        RGB image array of the webcam frame or None if failed
     """
     try:
-        # Initialize webcam
-        cap = cv2.VideoCapture(camera_id)
-        
-        if not cap.isOpened():
-            log.error(f"Could not open camera {camera_id}")
-            return None
-        
-        # Set resolution
-        cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
-        
-        # Allow camera to initialize
-        time.sleep(0.5)
-        
-        # Capture frame
-        ret, frame = cap.read()
+        with _CAM_LOCK:
+            cap = _get_camera(camera_id)
+            if cap is None:
+                return None
+            
+            # Skip stale buffered frames without decoding them, then
+            # decode only the latest one
+            for _ in range(WEBCAM_STALE_FRAMES):
+                cap.grab()
+            ret, frame = cap.retrieve()
         
         if not ret:
             log.error("Failed to capture image from webcam")
-            cap.release()
+            release_cameras()
             return None
         
-        # Save the image
-        timestamp = int(time.time())
-        output_path = os.path.join(TEMP_DIR, f"webcam_{timestamp}.jpg")
-        cv2.imwrite(output_path, frame)
+        # Shrink first so the colour conversion touches fewer pixels
+        height, width = frame.shape[:2]
+        if max_size and max(height, width) > max_size:
+            scale = max_size / max(height, width)
+            frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
         
-        # Release the camera
-        cap.release()
+        # OpenCV frames are BGR
+        image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
         
-        log.info(f"Webcam image captured and saved to {output_path}")
-        return output_path
+        log.info(f"Webcam image captured ({image.shape[1]}x{image.shape[0]})")
+        return image
     
     except Exception as e:
         log.error(f"Error capturing webcam image: {e}")
         return None
 
-def process_image(image_path: str, max_size: int = 1024) -> Optional[str]:
-    """Process an image for use with Gemini Vision API.
+def _unique_suffix() -> str:
+    """Build a filename suffix that is unique even for same-second captures."""
+    return f"{time.monotonic_ns()}_{uuid.uuid4().hex[:8]}"
+
+def _load_image(image: Union[str, np.ndarray], max_size: int) -> PIL.Image.Image:
+    """Load an image path or RGB array as a PIL image.
+    
+    Args:
+        image: Path to the image file, or an RGB image array
+        max_size: Maximum dimension the image will be resized to
+        
+    Returns:
+        The loaded image
+    """
+    if isinstance(image, np.ndarray):
+        # Use the in-memory frame directly
+        return PIL.Image.fromarray(np.ascontiguousarray(image))
+    
+    pil_image = PIL.Image.open(image)
+    
+    # Let libjpeg decode JPEGs at a reduced scale when possible
+    if pil_image.format == "JPEG":
+        pil_image.draft("RGB", (max_size, max_size))
+    return pil_image
+
+def _encode_image(image: PIL.Image.Image, max_size: int) -> bytes:
+    """Resize an image to fit max_size and encode it.
+    
+    Images are encoded as WebP, or as JPEG if PROCESSED_IMAGE_FORMAT is
+    "jpeg" or Pillow lacks WebP support.
     
     Args:
-        image_path: Path to the image file
+        image: The image to process
         max_size: Maximum dimension (width or height) for the processed image
         
     Returns:
-        Path to the processed image or None if failed
+        The encoded image bytes
     """
-    try:
-        # Open the image
-        image = PIL.Image.open(image_path)
+    # Resize if needed while maintaining aspect ratio
+    width, height = image.size
+    if width > max_size or height > max_size:
+        if width > height:
+            new_width = max_size
+            new_height = int(height * (max_size / width))
+        else:
+            new_height = max_size
+            new_width = int(width * (max_size / height))
         
-        # Resize if needed while maintaining aspect ratio
-        width, height = image.size
-        if width > max_size or height > max_size:
-            if width > height:
-                new_width = max_size
-                new_height = int(height * (max_size / width))
-            else:
-                new_height = max_size
-                new_width = int(width * (max_size / height))
-            
-            image = image.resize((new_width, new_height), PIL.Image.LANCZOS)
+        image = image.resize((new_width, new_height), PIL.Image.LANCZOS,
+                             reducing_gap=RESIZE_REDUCING_GAP)
+    
+    # Encode the processed image; skip JPEG's extra Huffman pass
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    buffer = io.BytesIO()
+    if _USE_WEBP:
+        image.save(buffer, "WEBP", quality=PROCESSED_QUALITY, method=4)
+    else:
+        image.save(buffer, "JPEG", quality=PROCESSED_QUALITY)
+    return buffer.getvalue()
+
+def _save_processed(data: bytes, filename: str) -> str:
+    """Write processed image bytes to TEMP_DIR.
+    
+    Args:
+        data: The encoded image
+        filename: Name of the source image, used to derive the output name
         
-        # Create output path
-        filename = os.path.basename(image_path)
-        processed_path = os.path.join(TEMP_DIR, f"processed_{filename}")
+    Returns:
+        Path to the processed image
+    """
+    processed_path = os.path.join(
+        TEMP_DIR, f"processed_{os.path.splitext(filename)[0]}{PROCESSED_EXTENSION}")
+    with open(processed_path, "wb") as f:
+        f.write(data)
+    
+    log.info(f"Image processed and saved to {processed_path}")
+    return processed_path
+
+def process_image_bytes(image: Union[str, np.ndarray], max_size: int = MAX_IMAGE_SIZE) -> Optional[bytes]:
+    """Process an image for use with Gemini Vision API without touching disk.
+    
+    Args:
+        image: Path to the image file, or an RGB image array
+        max_size: Maximum dimension (width or height) for the processed image
+        
+    Returns:
+        The encoded image bytes or None if failed
+    """
+    try:
+        data = _encode_image(_load_image(image, max_size), max_size)
+        log.info(f"Image processed ({len(data)} bytes)")
+        return data
+    
+    except Exception as e:
+        log.error(f"Error processing image: {e}")
+        return None
+
+@functools.lru_cache(maxsize=32)
+def _process_image_file(image_path: str, mtime_ns: int, size: int, max_size: int) -> str:
+    """Process an image file, memoized on its path, mtime, size and max_size.
+    
+    Errors propagate so that failures are never cached.
+    """
+    data = _encode_image(_load_image(image_path, max_size), max_size)
+    return _save_processed(data, os.path.basename(image_path))
+
+def process_image(image: Union[str, np.ndarray], max_size: int = MAX_IMAGE_SIZE) -> Optional[str]:
+    """Process an image for use with Gemini Vision API and save it to disk.
+    
+    Prefer process_image_bytes when the result is only uploaded. Results
+    for image files are cached, so processing the same unchanged file
+    again returns the existing output immediately.
+    
+    Args:
+        image: Path to the image file, or an RGB image array
+        max_size: Maximum dimension (width or height) for the processed image
         
-        # Save the processed image
-        image.save(processed_path, quality=85, optimize=True)
+    Returns:
+        Path to the processed image or None if failed
+    """
+    try:
+        if isinstance(image, np.ndarray):
+            data = _encode_image(_load_image(image, max_size), max_size)
+            return _save_processed(data, f"capture_{_unique_suffix()}.jpg")
         
-        log.info(f"Image processed and saved to {processed_path}")
+        stat = os.stat(image)
+        processed_path = _process_image_file(image, stat.st_mtime_ns, stat.st_size, max_size)
+        if not os.path.exists(processed_path):
+            # Output was removed behind our back; drop stale entries and redo
+            _process_image_file.cache_clear()
+            processed_path = _process_image_file(image, stat.st_mtime_ns, stat.st_size, max_size)
         return processed_path
     
     except Exception as e:
@@ -198,41 +437,70 @@ def cleanup_old_images(max_age_hours: int = 24) -> None:
         current_time = time.time()
         max_age_seconds = max_age_hours * 3600
         
-        for file_path in Path(TEMP_DIR).glob("*.*"):
-            if file_path.is_file():
-                file_age = current_time - os.path.getmtime(file_path)
-                if file_age > max_age_seconds:
-                    os.remove(file_path)
-                    log.info(f"Removed old image: {file_path}")
+        # One directory read; DirEntry caches the type and stat results
+        with os.scandir(TEMP_DIR) as entries:
+            for entry in entries:
+                try:
+                    if not entry.is_file(follow_symlinks=False):
+                        continue
+                    file_age = current_time - entry.stat(follow_symlinks=False).st_mtime
+                    if file_age > max_age_seconds:
+                        os.unlink(entry.path)
+                        log.info(f"Removed old image: {entry.path}")
+                except OSError as e:
+                    log.error(f"Error removing {entry.path}: {e}")
+        
+        # Forget processed results whose files may have just been removed
+        _process_image_file.cache_clear()
     
     except Exception as e:
         log.error(f"Error cleaning up old images: {e}")
 
+def _maybe_cleanup_old_images() -> None:
+    """Run cleanup_old_images in the background at most once per interval."""
+    global _LAST_CLEANUP
+    
+    with _CLEANUP_LOCK:
+        now = time.monotonic()
+        if _LAST_CLEANUP and now - _LAST_CLEANUP < CLEANUP_INTERVAL_SECONDS:
+            return
+        _LAST_CLEANUP = now
+    
+    threading.Thread(target=cleanup_old_images, name="fixer-image-cleanup", daemon=True).start()
+
 # Example usage function
-def capture_device_image(use_webcam: bool = False) -> Optional[str]:
+def capture_device_image(use_webcam: bool = False,
+                         region: Optional[Dict[str, int]] = None,
+                         as_path: bool = False) -> Union[bytes, str, None]:
     """Capture an image from either webcam or screenshot based on preference.
     
     Args:
         use_webcam: If True, capture from webcam; otherwise capture screenshot
+        region: Optional screen area to capture instead of the primary monitor
+        as_path: If True, save the processed image to TEMP_DIR and return
+            its path instead of the encoded bytes
         
     Returns:
-        Path to the processed image or None if failed
+        The processed image bytes (or path if as_path) or None if failed
     """
     try:
         # Capture image
         if use_webcam:
-            raw_image_path = capture_webcam()
+            raw_image = capture_webcam(max_size=MAX_IMAGE_SIZE)
         else:
-            raw_image_path = capture_screenshot()
+            raw_image = capture_screenshot(region=region)
         
-        if not raw_image_path:
+        if raw_image is None:
             return None
         
+        if not as_path:
+            return process_image_bytes(raw_image)
+        
         # Process the image
-        processed_image_path = process_image(raw_image_path)
+        processed_image_path = process_image(raw_image)
         
-        # Clean up old images
-        cleanup_old_images()
+        # Clean up old images (debounced, off the capture path)
+        _maybe_cleanup_old_images()
         
         return processed_image_path
     
@@ -240,6 +508,40 @@ def capture_device_image(use_webcam: bool = False) -> Optional[str]:
         log.error(f"Error capturing device image: {e}")
         return None
 
+async def acapture_device_image(use_webcam: bool = False,
+                                region: Optional[Dict[str, int]] = None,
+                                as_path: bool = False) -> Union[bytes, str, None]:
+    """Async version of capture_device_image that keeps the event loop free.
+    
+    Capture, resize and encode run in a worker thread; OpenCV and Pillow
+    release the GIL for the heavy work.
+    
+    Args:
+        use_webcam: If True, capture from webcam; otherwise capture screenshot
+        region: Optional screen area to capture instead of the primary monitor
+        as_path: If True, return the path of a saved image instead of bytes
+        
+    Returns:
+        The processed image bytes (or path if as_path) or None if failed
+    """
+    return await asyncio.to_thread(capture_device_image, use_webcam, region, as_path)
+
+def warmup() -> None:
+    """Pre-load Pillow's resize and encoder code paths.
+    
+    The first LANCZOS resize and encode otherwise pay for plugin loading
+    and filter setup, which shows up as extra latency on the first capture.
+    """
+    try:
+        image = PIL.Image.new("RGB", (8, 8))
+        _encode_image(image.resize((4, 4), PIL.Image.LANCZOS), 4)
+        log.info("Image pipeline warmed up")
+    except Exception as e:
+        log.error(f"Error warming up image pipeline: {e}")
+
+if config.get_config("FIXER_WARMUP", "0") == "1":
+    threading.Thread(target=warmup, name="fixer-vision-warmup", daemon=True).start()
+
 
 class ChatLoop:
     """Handles chat functionality with Gemini API.
@@ -247,19 +549,27 @@ class ChatLoop:
     This class manages the chat interaction with the Gemini API.
     """
     
-    def __init__(self, prompt: str = None, client=None):
+    def __init__(self, prompt: str = None, client: Optional[genai.GenerativeModel] = None):
         """Initialize the ChatLoop.
         
         Args:
             prompt: Optional initial prompt to send to the model
-            client: The Gemini API client instance
+            client: The Gemini model to chat with (default: the shared model)
         """
         self.prompt = prompt
         self.session = None
-        self.client = client or genai
+        self.client = client if client is not None else get_model()
+        self._session_lock = asyncio.Lock()
         
         log.info(f"Initialized ChatLoop")
     
+    async def _ensure_session(self):
+        """Start the chat session once, even if run() is called concurrently."""
+        async with self._session_lock:
+            if self.session is None:
+                self.session = self.client.start_chat()
+        return self.session
+    
     async def send_text(self):
         """Send text input to the model."""
         # Send initial prompt if provided
@@ -284,23 +594,14 @@ class ChatLoop:
                 log.error(f"Error sending text: {e}")
                 break
     
-    async def receive_text(self):
-        """Receive text responses from the model."""
-        # Since send_text handles both sending and receiving responses,
-        # this method can be a no-op or used for additional logic if needed
-        while True:
-            await asyncio.sleep(1)  # Keep the coroutine alive
-            # In a real async API, this would handle streaming responses
-            # For now, responses are handled in send_text
-    
     async def run(self):
         """Run the ChatLoop."""
         log.info(f"Starting ChatLoop")
         
         try:
-            # Start the chat session synchronously but wrapped in asyncio.to_thread
-            self.session = await asyncio.to_thread(self.client.start_chat)
-            await asyncio.gather(self.send_text(), self.receive_text())
+            # start_chat only builds local state, no network round-trip
+            await self._ensure_session()
+            await self.send_text()
         except Exception as e:
             log.error(f"Error in ChatLoop: {e}")
             traceback.print_exception(e)
@@ -315,5 +616,5 @@ def run_chat(prompt: str = None) -> None:
         prompt: Optional initial prompt to send to the model
     """
     log.info(f"Starting chat")
-    loop = ChatLoop(prompt=prompt, client=model)
+    loop = ChatLoop(prompt=prompt)
     asyncio.run(loop.run())
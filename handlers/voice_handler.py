@@ -7,13 +7,20 @@ Enables voice interaction with the Fixer AI agent.
 Supports both traditional speech recognition and Gemini 2.0 Flash Live API for real-time audio processing.
 """
 
+import atexit
+import collections
 import os
+import queue
 import time
 import tempfile
 import asyncio
-import base64
+import binascii
+import functools
+import hashlib
 import io
 import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Tuple, List, Dict, Any, Union
 
 # Traditional speech recognition
@@ -30,6 +37,18 @@ import mss
 import google.generativeai as genai
 from google.genai import types
 
+# Optional in-process MP3 decoding for gTTS playback
+try:
+    import miniaudio
+except ImportError:
+    miniaudio = None
+
+# Optional streaming speech recognition (Google Cloud Speech-to-Text)
+try:
+    from google.cloud import speech
+except ImportError:
+    speech = None
+
 try:
     from google.genai.types import LiveConnectConfig, SpeechConfig, VoiceConfig, PrebuiltVoiceConfig
 except ImportError:
@@ -39,6 +58,7 @@ except ImportError:
     VoiceConfig = None
     PrebuiltVoiceConfig = None
 
+import prompts
 from utils import logger, config
 from handlers import gemini_handler, vision_handler
 
@@ -49,34 +69,151 @@ log = logger.get_logger(__name__)
 TEMP_DIR = config.get_config("TEMP_DIR", os.path.join(tempfile.gettempdir(), "fixer_ai"))
 os.makedirs(TEMP_DIR, exist_ok=True)
 
-# Initialize speech recognizer for traditional mode
+# Synthesized gTTS audio, reused for repeated phrases
+TTS_CACHE_DIR = os.path.join(TEMP_DIR, "tts_cache")
+TTS_CACHE_MAX_FILES = 200
+os.makedirs(TTS_CACHE_DIR, exist_ok=True)
+
+# Detected pyttsx3 voice, cached per machine (outside the user's .env)
+TTS_VOICE_CACHE_FILE = os.path.join(TEMP_DIR, "tts_voice_id")
+
+# Initialize speech recognizer for traditional mode; after a one-time
+# calibration the energy threshold keeps adapting on its own
 recognizer = sr.Recognizer()
+recognizer.dynamic_energy_threshold = True
+_NOISE_CALIBRATED = False
+
+# Microphone kept open across commands; the lock serializes its users
+_MIC = None
+_MIC_LOCK = threading.Lock()
 
-# Initialize TTS engine for traditional mode
-tts_engine = pyttsx3.init()
+# TTS engine for traditional mode; created and driven by the TTS worker thread
+tts_engine = None
 
 # Configure TTS properties
 voice_rate = int(config.get_config("VOICE_RATE", "175"))  # Speed of speech
 voice_volume = float(config.get_config("VOICE_VOLUME", "0.9"))  # Volume (0.0 to 1.0)
-tts_engine.setProperty('rate', voice_rate)
-tts_engine.setProperty('volume', voice_volume)
 
-# Try to set a more natural voice if available
-voices = tts_engine.getProperty('voices')
-for voice in voices:
-    # Prefer female voice if available
-    if "female" in voice.name.lower() or "zira" in voice.name.lower():
-        tts_engine.setProperty('voice', voice.id)
-        break
+# Pending (text, use_gtts) utterances, spoken in order by the TTS worker
+_TTS_QUEUE: "queue.Queue[Tuple[str, bool]]" = queue.Queue()
+_TTS_THREAD: Optional[threading.Thread] = None
+_TTS_THREAD_LOCK = threading.Lock()
+
+def _init_tts_engine():
+    """Create and configure the pyttsx3 engine (on the thread that will use it)."""
+    engine = pyttsx3.init()
+    engine.setProperty('rate', voice_rate)
+    engine.setProperty('volume', voice_volume)
+    
+    # Use the configured or previously detected voice; if it's missing on this
+    # machine (e.g. removed by an OS update), scan again
+    voice_id = config.get_config("TTS_VOICE_ID") or _load_cached_voice_id()
+    if voice_id:
+        try:
+            engine.setProperty('voice', voice_id)
+            return engine
+        except Exception as e:
+            log.warning(f"TTS voice {voice_id} unavailable, detecting again: {e}")
+    
+    voice_id = _detect_voice_id(engine)
+    if voice_id:
+        try:
+            engine.setProperty('voice', voice_id)
+            _save_cached_voice_id(voice_id)
+        except Exception as e:
+            log.error(f"Could not set TTS voice: {e}")
+    
+    return engine
+
+def _detect_voice_id(engine) -> Optional[str]:
+    """Scan the installed voices for a more natural one."""
+    for voice in engine.getProperty('voices'):
+        # Prefer female voice if available
+        if "female" in voice.name.lower() or "zira" in voice.name.lower():
+            return voice.id
+    return None
+
+def _load_cached_voice_id() -> Optional[str]:
+    """Read the voice detected on a previous run, if any."""
+    try:
+        with open(TTS_VOICE_CACHE_FILE, "r") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+def _save_cached_voice_id(voice_id: str) -> None:
+    """Remember the detected voice so later runs skip the scan."""
+    try:
+        with open(TTS_VOICE_CACHE_FILE, "w") as f:
+            f.write(voice_id)
+    except OSError as e:
+        log.error(f"Could not save TTS voice: {e}")
 
 # Gemini Live API configuration
 FORMAT = pyaudio.paInt16
 CHANNELS = 1
 SEND_SAMPLE_RATE = 16000
 RECEIVE_SAMPLE_RATE = 24000
-CHUNK_SIZE = 1024
+CHUNK_SIZE = int(config.get_config("VOICE_CHUNK_SIZE", "800"))  # 800 frames = 50 ms at 16 kHz
+PLAY_CHUNK = RECEIVE_SAMPLE_RATE * 2 // 20  # Bytes per playback write (50 ms of 16-bit audio)
+AUDIO_BUFFER_BYTES = RECEIVE_SAMPLE_RATE * 2 * 60  # Received audio buffered ahead of playback (60 s)
+AUDIO_STALL_TIMEOUT = 5.0  # Seconds to wait for playback to free space before dropping audio
+SEND_COALESCE_BYTES = SEND_SAMPLE_RATE * 2 * 80 // 1000  # Max PCM per send (80 ms of 16-bit audio)
+FRAME_INTERVAL = 1.0  # Seconds between video frames sent to the Live API
+_UNCHANGED = object()  # Returned by a capture when the frame matches the last one
+SCREEN_FINGERPRINT_SIZE = (64, 36)  # Greyscale thumbnail compared to detect screen changes
+SCREEN_RESEND_INTERVAL = 5.0  # Seconds after which an unchanged-looking screen is sent anyway
+LIVE_JPEG_QUALITY = 75  # Quality of frames streamed to the Live API
+MIC_QUEUE_SIZE = 64  # Mic chunks buffered between the PortAudio thread and the loop
 MODEL = "gemini-2.5-flash"
 
+# Streaming speech recognition settings
+STT_LANGUAGE = "en-US"
+PHRASE_TIME_LIMIT = 10  # Seconds of speech allowed after listening starts
+
+def _get_microphone():
+    """Get the shared, already-open microphone source.
+    
+    Must be called with _MIC_LOCK held.
+    """
+    global _MIC
+    
+    if _MIC is None:
+        mic = sr.Microphone()
+        mic.__enter__()
+        _MIC = mic
+    return _MIC
+
+def close_microphone() -> None:
+    """Close the shared microphone source."""
+    global _MIC
+    
+    with _MIC_LOCK:
+        if _MIC is not None:
+            _MIC.__exit__(None, None, None)
+            _MIC = None
+
+atexit.register(close_microphone)
+
+def calibrate_microphone(source=None, duration: float = 3.0) -> None:
+    """Calibrate the recognizer's energy threshold to the ambient noise.
+    
+    Args:
+        source: An open sr.Microphone, or None to use the shared one
+        duration: Seconds of ambient audio to sample
+    """
+    global _NOISE_CALIBRATED
+    
+    if source is None:
+        with _MIC_LOCK:
+            calibrate_microphone(_get_microphone(), duration)
+        return
+    
+    log.info("Adjusting for ambient noise... please wait")
+    recognizer.adjust_for_ambient_noise(source, duration=duration)
+    _NOISE_CALIBRATED = True
+    log.info(f"Ambient noise adjustment complete (threshold {recognizer.energy_threshold:.0f})")
+
 def listen_for_command(timeout: int = 15) -> Optional[str]:
     """Listen for a voice command using the microphone.
 
@@ -87,17 +224,17 @@ def listen_for_command(timeout: int = 15) -> Optional[str]:
         Optional[str]: The recognized command, or None if no command was recognized.
     """
     try:
-        with sr.Microphone() as source:
+        with _MIC_LOCK:
+            source = _get_microphone()
             log.info("Listening for command...")
-            log.info("Adjusting for ambient noise... please wait")
-            recognizer.adjust_for_ambient_noise(source, duration=3)
-            log.info("Ambient noise adjustment complete")
+            if not _NOISE_CALIBRATED:
+                calibrate_microphone(source)
             log.info(f"Listening with timeout of {timeout} seconds")
-            audio = recognizer.listen(source, timeout=timeout, phrase_time_limit=10)
-            log.info("Processing speech...")
-            command = recognizer.recognize_google(audio)
-            log.info(f"Recognized command: {command}")
-            return command
+            audio = recognizer.listen(source, timeout=timeout, phrase_time_limit=PHRASE_TIME_LIMIT)
+        log.info("Processing speech...")
+        command = recognizer.recognize_google(audio)
+        log.info(f"Recognized command: {command}")
+        return command
     except sr.WaitTimeoutError:
         log.info("No speech detected within timeout")
         return None
@@ -111,27 +248,187 @@ def listen_for_command(timeout: int = 15) -> Optional[str]:
         log.error(f"Error during speech recognition: {e}")
         return None
 
-def speak_text(text: str, use_gtts: bool = False) -> None:
-    """Convert text to speech and play it.
+@functools.lru_cache(maxsize=1)
+def _get_speech_client():
+    """Get the shared Cloud Speech client (raises if credentials are missing)."""
+    return speech.SpeechClient()
+
+def listen_for_command_streaming(timeout: int = 15) -> Optional[str]:
+    """Listen for a voice command using streaming Google Cloud recognition.
+    
+    Audio is streamed while the user speaks, so the transcript is ready as
+    soon as they stop instead of after a full upload. Falls back to
+    listen_for_command when google-cloud-speech or its credentials are
+    unavailable.
+
+    Args:
+        timeout (int, optional): Timeout for listening in seconds. Defaults to 15.
+
+    Returns:
+        Optional[str]: The recognized command, or None if no command was recognized.
+    """
+    if speech is None:
+        return listen_for_command(timeout)
+    
+    try:
+        client = _get_speech_client()
+    except Exception as e:
+        log.info(f"Streaming recognition unavailable, falling back: {e}")
+        return listen_for_command(timeout)
+    
+    audio_queue = queue.Queue()
+    
+    def callback(in_data, frame_count, time_info, status):
+        audio_queue.put(in_data)
+        return (None, pyaudio.paContinue)
+    
+    # Don't hold the device open twice if the sr.Microphone fallback used it
+    close_microphone()
+    
+    stream = None
+    try:
+        stream = vision_handler.get_pya().open(
+            format=FORMAT,
+            channels=CHANNELS,
+            rate=SEND_SAMPLE_RATE,
+            input=True,
+            frames_per_buffer=CHUNK_SIZE,
+            stream_callback=callback,
+        )
+        deadline = time.monotonic() + timeout + PHRASE_TIME_LIMIT
+        
+        def audio_requests():
+            while time.monotonic() < deadline:
+                try:
+                    chunk = audio_queue.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                yield speech.StreamingRecognizeRequest(audio_content=chunk)
+        
+        streaming_config = speech.StreamingRecognitionConfig(
+            config=speech.RecognitionConfig(
+                encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
+                sample_rate_hertz=SEND_SAMPLE_RATE,
+                language_code=STT_LANGUAGE,
+            ),
+            interim_results=True,
+            single_utterance=True,
+        )
+        
+        log.info("Listening for command (streaming)...")
+        for response in client.streaming_recognize(streaming_config, audio_requests()):
+            for result in response.results:
+                if result.is_final and result.alternatives:
+                    command = result.alternatives[0].transcript.strip()
+                    log.info(f"Recognized command: {command}")
+                    return command or None
+        
+        log.info("No speech detected within timeout")
+        return None
+    
+    except Exception as e:
+        log.error(f"Error during streaming speech recognition: {e}")
+        return None
+    
+    finally:
+        if stream is not None:
+            stream.stop_stream()
+            stream.close()
+
+def _evict_tts_cache() -> None:
+    """Delete the least recently used cached speech files beyond TTS_CACHE_MAX_FILES."""
+    try:
+        with os.scandir(TTS_CACHE_DIR) as entries:
+            files = [(entry.stat().st_mtime, entry.path) for entry in entries if entry.is_file()]
+        if len(files) <= TTS_CACHE_MAX_FILES:
+            return
+        
+        files.sort()
+        for _, path in files[:len(files) - TTS_CACHE_MAX_FILES]:
+            os.unlink(path)
+    except OSError as e:
+        log.error(f"Error evicting TTS cache: {e}")
+
+def _synthesize_gtts(text: str, lang: str = "en", slow: bool = False) -> str:
+    """Synthesize speech with gTTS, reusing a cached MP3 for repeated text.
+    
+    Args:
+        text: Text to synthesize
+        lang: Language code
+        slow: Whether to use slow speech
+        
+    Returns:
+        Path to the MP3 file
+    """
+    key = hashlib.sha1(f"{lang}|{slow}|{text}".encode("utf-8")).hexdigest()
+    audio_path = os.path.join(TTS_CACHE_DIR, f"{key}.mp3")
+    
+    if os.path.exists(audio_path):
+        # Mark as recently used for eviction
+        os.utime(audio_path)
+        log.info("Using cached speech audio")
+        return audio_path
+    
+    # Write to a unique temp name first so a partial file is never served
+    tmp_path = os.path.join(TTS_CACHE_DIR, f"{key}_{uuid.uuid4().hex[:8]}.tmp")
+    gTTS(text=text, lang=lang, slow=slow).save(tmp_path)
+    os.replace(tmp_path, audio_path)
+    
+    _evict_tts_cache()
+    return audio_path
+
+# Output stream for decoded gTTS audio, opened once by the TTS worker
+_PLAYBACK_STREAM = None
+
+def _play_mp3(audio_path: str) -> None:
+    """Play an MP3 file, decoding it in-process when miniaudio is available.
+    
+    Falls back to the system's associated player.
+    
+    Args:
+        audio_path: Path to the MP3 file
+    """
+    global _PLAYBACK_STREAM
+    
+    if miniaudio is None:
+        os.system(f"start {audio_path}")
+        return
+    
+    decoded = miniaudio.decode_file(
+        audio_path,
+        output_format=miniaudio.SampleFormat.SIGNED16,
+        nchannels=CHANNELS,
+        sample_rate=RECEIVE_SAMPLE_RATE,
+    )
+    if _PLAYBACK_STREAM is None:
+        _PLAYBACK_STREAM = vision_handler.get_pya().open(
+            format=FORMAT,
+            channels=CHANNELS,
+            rate=RECEIVE_SAMPLE_RATE,
+            output=True,
+        )
+    _PLAYBACK_STREAM.write(decoded.samples.tobytes())
+
+def _speak_now(text: str, use_gtts: bool) -> None:
+    """Synthesize and play text, blocking until playback is done.
     
     Args:
         text: Text to speak
         use_gtts: If True, use Google TTS (online) instead of pyttsx3 (offline)
     """
+    global tts_engine
+    
     try:
         if use_gtts:
-            # Use Google TTS (requires internet)
-            timestamp = int(time.time())
-            audio_path = os.path.join(TEMP_DIR, f"speech_{timestamp}.mp3")
-            
-            # Generate speech
-            tts = gTTS(text=text, lang='en', slow=False)
-            tts.save(audio_path)
+            # Use Google TTS (requires internet); repeated phrases come from cache
+            audio_path = _synthesize_gtts(text, lang='en', slow=False)
             
             # Play the audio file
-            os.system(f"start {audio_path}")
+            _play_mp3(audio_path)
         else:
             # Use pyttsx3 (offline TTS)
+            if tts_engine is None:
+                tts_engine = _init_tts_engine()
             tts_engine.say(text)
             tts_engine.runAndWait()
         
@@ -140,6 +437,37 @@ def speak_text(text: str, use_gtts: bool = False) -> None:
     except Exception as e:
         log.error(f"Error in text-to-speech: {e}")
 
+def _tts_worker() -> None:
+    """Speak queued utterances one at a time."""
+    while True:
+        text, use_gtts = _TTS_QUEUE.get()
+        try:
+            _speak_now(text, use_gtts)
+        finally:
+            _TTS_QUEUE.task_done()
+
+def speak_text(text: str, use_gtts: bool = False, wait: bool = False) -> None:
+    """Convert text to speech and play it.
+    
+    Speech runs on a background worker so the caller (e.g. the listening
+    loop) is not blocked for the length of the utterance.
+    
+    Args:
+        text: Text to speak
+        use_gtts: If True, use Google TTS (online) instead of pyttsx3 (offline)
+        wait: If True, block until everything queued so far has been spoken
+    """
+    global _TTS_THREAD
+    
+    with _TTS_THREAD_LOCK:
+        if _TTS_THREAD is None:
+            _TTS_THREAD = threading.Thread(target=_tts_worker, name="fixer-tts", daemon=True)
+            _TTS_THREAD.start()
+    
+    _TTS_QUEUE.put((text, use_gtts))
+    if wait:
+        _TTS_QUEUE.join()
+
 def process_voice_command(command: str, capture_image: bool = False) -> Dict[str, Any]:
     """Process a voice command and generate a response.
     
@@ -155,14 +483,14 @@ def process_voice_command(command: str, capture_image: bool = False) -> Dict[str
             return {"cause": "No command detected", "steps": ["Please try again"], "script": ""}
         
         # Capture image if requested
-        image_path = None
+        image = None
         if capture_image:
             log.info("Capturing image for multimodal processing")
-            image_path = vision_handler.capture_device_image(use_webcam=False)  # Default to screenshot
+            image = vision_handler.capture_device_image(use_webcam=False)  # Default to screenshot
         
         # Process with Gemini
-        if image_path:
-            result = gemini_handler.process_multimodal(command, image_path)
+        if image:
+            result = gemini_handler.process_multimodal(command, image)
         else:
             result = gemini_handler.process_text(command)
         
@@ -172,22 +500,45 @@ def process_voice_command(command: str, capture_image: bool = False) -> Dict[str
         log.error(f"Error processing voice command: {e}")
         return {"cause": "Error processing command", "steps": [f"Error: {str(e)}"], "script": ""}
 
+# Shared Gemini model, built once and reused across voice sessions
+_GEMINI_MODEL = None
+_GEMINI_LOCK = threading.Lock()
+
 # Initialize Gemini client for Live API
 def initialize_gemini_client():
-    """Initialize the Gemini client for Live API."""
-    try:
-        api_key = config.get_config("GEMINI_API_KEY", os.environ.get("GEMINI_API_KEY"))
-        if not api_key:
-            log.error("Gemini API key not found. Live API will not be available.")
+    """Initialize the Gemini client for Live API.
+    
+    The client is created once and returned from cache on later calls.
+    """
+    global _GEMINI_MODEL
+    
+    if _GEMINI_MODEL is not None:
+        return _GEMINI_MODEL
+    
+    with _GEMINI_LOCK:
+        if _GEMINI_MODEL is not None:
+            return _GEMINI_MODEL
+        
+        try:
+            api_key = config.get_config("GEMINI_API_KEY", os.environ.get("GEMINI_API_KEY"))
+            if not api_key:
+                log.error("Gemini API key not found. Live API will not be available.")
+                return None
+                
+            genai.configure(api_key=api_key)
+            _GEMINI_MODEL = genai.GenerativeModel(MODEL)
+            log.info("Gemini Live API client initialized successfully")
+            return _GEMINI_MODEL
+        except Exception as e:
+            log.error(f"Failed to initialize Gemini client: {e}")
             return None
-            
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel(MODEL)
-        log.info("Gemini Live API client initialized successfully")
-        return model
-    except Exception as e:
-        log.error(f"Failed to initialize Gemini client: {e}")
-        return None
+
+def reset_gemini_client() -> None:
+    """Drop the cached Gemini client so the next call rebuilds it (e.g. after a key change)."""
+    global _GEMINI_MODEL
+    
+    with _GEMINI_LOCK:
+        _GEMINI_MODEL = None
 
 # Live API configuration
 def get_live_config():
@@ -209,6 +560,9 @@ def get_live_config():
 class LiveAudioLoop:
     """Handles real-time audio and visual interaction using Gemini Live API."""
     
+    # System prompt shared by all loops, loaded on first use
+    _SYSTEM_PROMPT: Optional[str] = None
+    
     def __init__(self, video_mode="camera"):
         """Initialize the Live Audio Loop.
         
@@ -216,27 +570,44 @@ class LiveAudioLoop:
             video_mode: Mode for video capture ("camera", "screen", or "none")
         """
         self.video_mode = video_mode
-        self.audio_in_queue = None
+        self.audio_ring = None
+        self.audio_buffered = 0  # Bytes currently in audio_ring
+        self.audio_dropped = 0  # Bytes dropped because playback stalled
+        self.audio_ready = None
+        self.audio_space = None
         self.out_queue = None
+        self.video_queue = None
         self.session = None
         self.audio_stream = None
         self.pya = pyaudio.PyAudio()
         self.client = initialize_gemini_client()
         self.running = False
         
+        # Capture devices, opened on first use and kept for the loop's lifetime
+        self._cap = None
+        self._cap_lock = threading.Lock()
+        self._sct_local = threading.local()
+        self._scts = []
+        self._last_screen_fingerprint = None
+        self._last_screen_sent = 0.0
+        
+        # Dedicated worker for capture/encode so it never delays audio work
+        # queued on the default executor
+        self._img_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fixer-img")
+        
         # System prompt for repair agent context
         self.system_prompt = self._load_system_prompt()
     
-    def _load_system_prompt(self):
-        """Load the system prompt for the Fixer AI agent."""
-        try:
-            prompt_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 
-                                     "prompts", "diagnose", "general.txt")
-            with open(prompt_path, "r") as f:
-                return f.read()
-        except Exception as e:
-            log.error(f"Failed to load system prompt: {e}")
-            return "You are Fixer, an AI repair agent specialized in diagnosing and troubleshooting technical issues."
+    @classmethod
+    def _load_system_prompt(cls):
+        """Load the system prompt for the Fixer AI agent (read once per process)."""
+        if cls._SYSTEM_PROMPT is None:
+            prompt = prompts.get_diagnostic_prompt("general")
+            if prompt is None:
+                log.error("Failed to load system prompt")
+                return "You are Fixer, an AI repair agent specialized in diagnosing and troubleshooting technical issues."
+            cls._SYSTEM_PROMPT = prompt
+        return cls._SYSTEM_PROMPT
 
     async def send_text(self):
         """Send text input to the Gemini Live API."""
@@ -266,103 +637,193 @@ class LiveAudioLoop:
     
     async def _capture_and_send_screen(self):
         """Capture and send a screenshot."""
-        frame = await asyncio.to_thread(self._get_screen)
+        frame = await self._run_image_task(self._get_screen)
         if frame:
             await self.session.send(input=frame, end_of_turn=True)
     
     async def _capture_and_send_webcam(self):
         """Capture and send a webcam image."""
-        cap = await asyncio.to_thread(cv2.VideoCapture, 0)
-        frame = await asyncio.to_thread(self._get_frame, cap)
-        cap.release()
+        frame = await self._run_image_task(self._get_frame)
         if frame:
             await self.session.send(input=frame, end_of_turn=True)
 
-    def _get_frame(self, cap):
+    async def _run_image_task(self, func):
+        """Run a blocking capture/encode function on the image worker."""
+        return await asyncio.get_running_loop().run_in_executor(self._img_pool, func)
+
+    def _get_sct(self):
+        """Get this thread's screen grabber (mss handles are not thread-safe)."""
+        sct = getattr(self._sct_local, "sct", None)
+        if sct is None:
+            sct = mss.mss()
+            self._sct_local.sct = sct
+            self._scts.append(sct)
+        return sct
+
+    def _release_devices(self):
+        """Stop the image worker, then release the webcam and screen grabbers."""
+        # Let any in-flight capture finish before its devices are closed
+        self._img_pool.shutdown(wait=True)
+        with self._cap_lock:
+            if self._cap is not None:
+                self._cap.release()
+                self._cap = None
+        for sct in self._scts:
+            sct.close()
+        self._scts.clear()
+
+    def _get_frame(self):
         """Get a frame from the webcam."""
-        # Read the frame
-        ret, frame = cap.read()
+        with self._cap_lock:
+            # Open the webcam once and keep it for later frames
+            if self._cap is None:
+                self._cap = cv2.VideoCapture(0)
+            # Read the frame
+            ret, frame = self._cap.read()
         # Check if the frame was read successfully
         if not ret:
             return None
-        # Convert BGR to RGB color space
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        img = PIL.Image.fromarray(frame_rgb)
-        img.thumbnail([1024, 1024])
-
-        image_io = io.BytesIO()
-        img.save(image_io, format="jpeg")
-        image_io.seek(0)
+        
+        # Shrink to fit 1024px and JPEG-encode the BGR frame directly with OpenCV
+        height, width = frame.shape[:2]
+        if max(height, width) > 1024:
+            scale = 1024.0 / max(height, width)
+            frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        
+        ok, buffer = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), LIVE_JPEG_QUALITY])
+        if not ok:
+            return None
 
         mime_type = "image/jpeg"
-        image_bytes = image_io.read()
-        return {"mime_type": mime_type, "data": base64.b64encode(image_bytes).decode()}
+        return {"mime_type": mime_type, "data": binascii.b2a_base64(buffer, newline=False).decode("ascii")}
 
-    def _get_screen(self):
-        """Get a screenshot."""
+    @staticmethod
+    def _screen_fingerprint(img) -> bytes:
+        """Get a small greyscale thumbnail of an image for exact comparison."""
+        return img.convert("L").resize(SCREEN_FINGERPRINT_SIZE, PIL.Image.BILINEAR).tobytes()
+
+    def _get_screen(self, skip_unchanged: bool = False):
+        """Get a screenshot.
+        
+        Args:
+            skip_unchanged: If True, return _UNCHANGED instead of re-encoding
+                when the screen looks the same as the last streamed frame and
+                that frame was sent less than SCREEN_RESEND_INTERVAL ago
+        """
         try:
-            sct = mss.mss()
+            sct = self._get_sct()
             monitor = sct.monitors[0]
 
             i = sct.grab(monitor)
 
-            mime_type = "image/jpeg"
-            image_bytes = mss.tools.to_png(i.rgb, i.size)
-            img = PIL.Image.open(io.BytesIO(image_bytes))
+            # Build the image straight from the raw pixels and encode once
+            img = PIL.Image.frombytes("RGB", i.size, i.rgb)
+            img.thumbnail([1024, 1024])
+
+            if skip_unchanged:
+                # Small changes (a new dialog line, typed text) can survive the
+                # downscale, so resend periodically even when nothing seems to change
+                fingerprint = self._screen_fingerprint(img)
+                now = time.monotonic()
+                if (fingerprint == self._last_screen_fingerprint
+                        and now - self._last_screen_sent < SCREEN_RESEND_INTERVAL):
+                    return _UNCHANGED
+                self._last_screen_fingerprint = fingerprint
+                self._last_screen_sent = now
 
             image_io = io.BytesIO()
-            img.save(image_io, format="jpeg")
-            image_io.seek(0)
+            img.save(image_io, format="JPEG", quality=LIVE_JPEG_QUALITY)
 
-            image_bytes = image_io.read()
-            return {"mime_type": mime_type, "data": base64.b64encode(image_bytes).decode()}
+            mime_type = "image/jpeg"
+            return {"mime_type": mime_type, "data": binascii.b2a_base64(image_io.getbuffer(), newline=False).decode("ascii")}
         except Exception as e:
             log.error(f"Error capturing screenshot: {e}")
             return None
 
-    async def get_frames(self):
-        """Continuously get frames from the webcam."""
-        try:
-            cap = await asyncio.to_thread(cv2.VideoCapture, 0)
+    async def _stream_video(self, capture):
+        """Send a frame about once a second, dropping frames while one is pending.
+        
+        Args:
+            capture: Blocking function returning a frame dict, _UNCHANGED to
+                skip this interval, or None on failure
+        """
+        while self.running:
+            # Don't capture (or queue behind audio) while the last frame is unsent
+            if self.video_queue.full():
+                await asyncio.sleep(0.25)
+                continue
 
-            while self.running:
-                frame = await asyncio.to_thread(self._get_frame, cap)
-                if frame is None:
-                    break
+            frame = await self._run_image_task(capture)
+            if frame is None:
+                break
 
-                await asyncio.sleep(1.0)  # Send frame every second
-                await self.out_queue.put(frame)
+            if frame is not _UNCHANGED:
+                self.video_queue.put_nowait(frame)
+            await asyncio.sleep(FRAME_INTERVAL)
 
-            # Release the VideoCapture object
-            cap.release()
+    async def get_frames(self):
+        """Continuously get frames from the webcam."""
+        try:
+            await self._stream_video(self._get_frame)
         except Exception as e:
             log.error(f"Error in get_frames: {e}")
 
     async def get_screen(self):
         """Continuously get screenshots."""
         try:
-            while self.running:
-                frame = await asyncio.to_thread(self._get_screen)
-                if frame is None:
-                    break
-
-                await asyncio.sleep(1.0)  # Send screen every second
-                await self.out_queue.put(frame)
+            await self._stream_video(functools.partial(self._get_screen, skip_unchanged=True))
         except Exception as e:
             log.error(f"Error in get_screen: {e}")
 
     async def send_realtime(self):
-        """Send realtime data to the Gemini Live API."""
+        """Send realtime data to the Gemini Live API.
+        
+        Audio is always sent first; a pending video frame goes out once the
+        audio queue has been serviced.
+        """
         try:
             while self.running:
-                msg = await self.out_queue.get()
-                await self.session.send(input=msg)
+                try:
+                    msg = await asyncio.wait_for(self.out_queue.get(), timeout=0.25)
+                except asyncio.TimeoutError:
+                    msg = None
+                if msg is not None:
+                    # Merge already-queued PCM chunks into one send
+                    parts = [msg["data"]]
+                    size = len(parts[0])
+                    while size < SEND_COALESCE_BYTES and not self.out_queue.empty():
+                        part = self.out_queue.get_nowait()["data"]
+                        parts.append(part)
+                        size += len(part)
+                    if len(parts) > 1:
+                        msg = {"data": b"".join(parts), "mime_type": "audio/pcm"}
+                    await self.session.send(input=msg)
+
+                if self.out_queue.empty() and not self.video_queue.empty():
+                    await self.session.send(input=self.video_queue.get_nowait())
         except Exception as e:
             log.error(f"Error in send_realtime: {e}")
 
     async def listen_audio(self):
-        """Listen for audio input from the microphone."""
+        """Listen for audio input from the microphone.
+        
+        PortAudio delivers chunks through a callback on its own thread; they
+        are handed to the event loop without a thread-pool hop per chunk.
+        """
         try:
+            loop = asyncio.get_running_loop()
+            mic_queue = asyncio.Queue(maxsize=MIC_QUEUE_SIZE)
+            
+            def enqueue(data):
+                if mic_queue.full():
+                    # Drop the oldest chunk rather than block the audio thread
+                    mic_queue.get_nowait()
+                mic_queue.put_nowait(data)
+            
+            def callback(in_data, frame_count, time_info, status):
+                loop.call_soon_threadsafe(enqueue, in_data)
+                return (None, pyaudio.paContinue)
+            
             mic_info = self.pya.get_default_input_device_info()
             self.audio_stream = await asyncio.to_thread(
                 self.pya.open,
@@ -372,12 +833,11 @@ class LiveAudioLoop:
                 input=True,
                 input_device_index=mic_info["index"],
                 frames_per_buffer=CHUNK_SIZE,
+                stream_callback=callback,
             )
             
-            kwargs = {"exception_on_overflow": False}
-            
             while self.running:
-                data = await asyncio.to_thread(self.audio_stream.read, CHUNK_SIZE, **kwargs)
+                data = await mic_queue.get()
                 await self.out_queue.put({"data": data, "mime_type": "audio/pcm"})
         except Exception as e:
             log.error(f"Error in listen_audio: {e}")
@@ -389,7 +849,7 @@ class LiveAudioLoop:
                 turn = self.session.receive()
                 async for response in turn:
                     if data := response.data:
-                        self.audio_in_queue.put_nowait(data)
+                        await self._buffer_audio(data)
                         continue
                     if text := response.text:
                         print(text, end="")
@@ -398,11 +858,38 @@ class LiveAudioLoop:
                 # For interruptions to work, we need to stop playback.
                 # So empty out the audio queue because it may have loaded
                 # much more audio than has played yet.
-                while not self.audio_in_queue.empty():
-                    self.audio_in_queue.get_nowait()
+                self.audio_ring.clear()
+                self.audio_buffered = 0
+                self.audio_space.set()
         except Exception as e:
             log.error(f"Error in receive_audio: {e}")
 
+    async def _buffer_audio(self, data: bytes) -> None:
+        """Queue received audio for playback, waiting for room if the buffer is full.
+        
+        The Live API sends audio faster than real time, so a long reply can fill
+        AUDIO_BUFFER_BYTES; receiving then waits for playback to catch up. Audio
+        is only dropped (oldest first, logged and counted) if playback makes no
+        progress for AUDIO_STALL_TIMEOUT seconds.
+        """
+        while self.audio_buffered and self.audio_buffered + len(data) > AUDIO_BUFFER_BYTES:
+            self.audio_space.clear()
+            try:
+                await asyncio.wait_for(self.audio_space.wait(), AUDIO_STALL_TIMEOUT)
+            except asyncio.TimeoutError:
+                dropped = 0
+                while self.audio_ring and self.audio_buffered + len(data) > AUDIO_BUFFER_BYTES:
+                    chunk = self.audio_ring.popleft()
+                    self.audio_buffered -= len(chunk)
+                    dropped += len(chunk)
+                self.audio_dropped += dropped
+                log.warning(f"Audio playback stalled, dropped {dropped} bytes "
+                            f"({self.audio_dropped} bytes this session)")
+        
+        self.audio_ring.append(data)
+        self.audio_buffered += len(data)
+        self.audio_ready.set()
+
     async def play_audio(self):
         """Play audio received from the Gemini Live API."""
         try:
@@ -414,8 +901,26 @@ class LiveAudioLoop:
                 output=True,
             )
             while self.running:
-                bytestream = await self.audio_in_queue.get()
-                await asyncio.to_thread(stream.write, bytestream)
+                if not self.audio_ring:
+                    self.audio_ready.clear()
+                    await self.audio_ready.wait()
+                    continue
+                
+                # Coalesce small queued chunks (up to PLAY_CHUNK) into one write
+                chunks = [self.audio_ring.popleft()]
+                size = len(chunks[0])
+                while size < PLAY_CHUNK and self.audio_ring:
+                    chunk = self.audio_ring.popleft()
+                    chunks.append(chunk)
+                    size += len(chunk)
+                self.audio_buffered = max(0, self.audio_buffered - size)
+                self.audio_space.set()
+                bytestream = chunks[0] if len(chunks) == 1 else b"".join(chunks)
+                
+                # Write large responses in bounded slices to avoid jitter spikes
+                view = memoryview(bytestream)
+                for offset in range(0, len(view), PLAY_CHUNK):
+                    await asyncio.to_thread(stream.write, bytes(view[offset:offset + PLAY_CHUNK]))
         except Exception as e:
             log.error(f"Error in play_audio: {e}")
 
@@ -434,8 +939,12 @@ class LiveAudioLoop:
                 asyncio.TaskGroup() as tg,
             ):
                 self.session = session
-                self.audio_in_queue = asyncio.Queue()
+                self.audio_ring = collections.deque()
+                self.audio_buffered = 0
+                self.audio_ready = asyncio.Event()
+                self.audio_space = asyncio.Event()
                 self.out_queue = asyncio.Queue(maxsize=5)
+                self.video_queue = asyncio.Queue(maxsize=1)
 
                 send_text_task = tg.create_task(self.send_text())
                 tg.create_task(self.send_realtime())
@@ -465,6 +974,7 @@ class LiveAudioLoop:
             self.running = False
             if self.audio_stream:
                 self.audio_stream.close()
+            self._release_devices()
             return True
 
 def run_live_mode(video_mode="camera"):
@@ -483,6 +993,19 @@ def run_live_mode(video_mode="camera"):
         log.error(f"Error in run_live_mode: {e}")
         return False
 
+def _format_spoken_response(response: Dict[str, Any]) -> str:
+    """Turn a structured diagnosis into plain text suitable for speech.
+    
+    Args:
+        response: Dict with "cause" and "steps" keys
+        
+    Returns:
+        The cause followed by the numbered steps
+    """
+    parts = [response.get("cause", "")]
+    parts.extend(f"Step {i}: {step}" for i, step in enumerate(response.get("steps", []), 1))
+    return " ".join(part for part in parts if part)
+
 def run_traditional_voice():
     """Run the traditional voice interaction loop using speech recognition."""
     log.info("Starting traditional voice interaction...")
@@ -491,25 +1014,27 @@ def run_traditional_voice():
     if gemini_client is None:
         log.error("Gemini client initialization failed. Voice mode will not work.")
         return
-
+    
     while True:
         try:
-            command = listen_for_command()
+            command = listen_for_command_streaming()
             if command:
                 log.info(f"Processing command: {command}")
                 # Use Gemini API to process the transcribed text
                 response = gemini_handler.process_text(command)
-                if response.get("success", False):
-                    content = response.get("content", "")
+                if "error" not in response:
+                    content = _format_spoken_response(response)
                     log.info(f"Gemini response: {content}")
                     # Optionally convert response to speech if configured
                     if config.get_config("VOICE_RESPONSE_ENABLED", False):
                         log.info("Converting response to speech")
-                        speak_text(content)
+                        # Finish speaking before listening again, so the mic
+                        # doesn't pick up our own voice as the next command
+                        speak_text(content, wait=True)
                 else:
                     error = response.get("error", "Unknown error processing command")
                     log.error(f"Error processing command: {error}")
-                    speak_text("Sorry, I encountered an error processing your command.")
+                    speak_text("Sorry, I encountered an error processing your command.", wait=True)
             else:
                 log.info("No command detected")
         except KeyboardInterrupt:
@@ -517,7 +1042,7 @@ def run_traditional_voice():
             break
         except Exception as e:
             log.error(f"Error in traditional voice interaction: {e}")
-            speak_text("Sorry, I encountered an error. Please try again.")
+            speak_text("Sorry, I encountered an error. Please try again.", wait=True)
 
 def run(use_live_api=False, video_mode="camera") -> None:
     """Run the voice interface in a continuous loop.
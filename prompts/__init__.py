@@ -6,6 +6,7 @@ Provides functions to load prompt templates from the prompts directory.
 Templates are organized by category (diagnose, scripts) and use case.
 """
 
+import functools
 import os
 from pathlib import Path
 from typing import Dict, Optional
@@ -22,9 +23,21 @@ PROMPTS_DIR = Path(__file__).parent
 DIAGNOSE_DIR = PROMPTS_DIR / "diagnose"
 SCRIPTS_DIR = PROMPTS_DIR / "scripts"
 
+@functools.lru_cache(maxsize=32)
+def _read_prompt(template_path: str) -> str:
+    """Read a prompt template file, memoized by path (errors are not cached)."""
+    with open(template_path, "r", encoding="utf-8") as f:
+        return f.read()
+
+def clear_prompt_cache() -> None:
+    """Forget cached templates so edited files are re-read."""
+    _read_prompt.cache_clear()
+
 def load_prompt(template_path: str) -> Optional[str]:
     """Load a prompt template from the specified path.
     
+    Templates are cached in memory after the first read.
+    
     Args:
         template_path: Path to the prompt template file
         
@@ -32,8 +45,7 @@ def load_prompt(template_path: str) -> Optional[str]:
         The prompt template as a string, or None if the file doesn't exist
     """
     try:
-        with open(template_path, "r", encoding="utf-8") as f:
-            return f.read()
+        return _read_prompt(template_path)
     except FileNotFoundError:
         log.error(f"Prompt template not found: {template_path}")
         return None
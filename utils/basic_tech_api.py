@@ -6,22 +6,68 @@ to enhance personalization of responses and repair suggestions.
 """
 
 import os
+import asyncio
+import atexit
+import concurrent.futures
+import copy
+import functools
+import queue
+import threading
+import weakref
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 import time
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 
 from utils import logger
 
 # Initialize logger
 log = logger.get_logger(__name__)
 
+# orjson is an optional, faster drop-in for encoding and decoding payloads
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# httpx is optional and only needed for the async client methods
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
 # Basic Tech API configuration
 # These should be set in environment variables or a secure config file
 BASIC_TECH_API_KEY = os.environ.get('BASIC_TECH_API_KEY', '')
 BASIC_TECH_PROJECT_ID = os.environ.get('BASIC_TECH_PROJECT_ID', '')
 BASIC_TECH_API_BASE_URL = 'https://api.basic.tech'
 BASIC_TECH_TABLE_ID = 'user_context'  # Table name for storing user context
+CONTEXT_CACHE_TTL = 30.0  # Seconds a fetched or written user context is reused
+MAX_STORED_INTERACTIONS = 10  # Most recent interactions kept in a user's context
+INTERACTION_BATCH_SIZE = 5  # Pending interactions that trigger a write
+INTERACTION_FLUSH_INTERVAL = 10.0  # Seconds after which pending interactions are written
+
+def _json_dumps(data: Any) -> bytes:
+    """Encode a payload as JSON bytes, using orjson when it is available."""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data).encode('utf-8')
+
+def _json_loads(content: bytes) -> Any:
+    """Decode a JSON response body, using orjson when it is available."""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+async def _async_none(*args, **kwargs) -> None:
+    """Async no-op used when the client is disabled."""
+    return None
+
+async def _async_false(*args, **kwargs) -> bool:
+    """Async no-op used when the client is disabled."""
+    return False
 
 class BasicTechAPI:
     """Class to handle Basic Tech API interactions for user context storage and retrieval."""
@@ -34,94 +80,369 @@ class BasicTechAPI:
             'Authorization': f'Bearer {self.api_key}',
             'Content-Type': 'application/json'
         }
+        self._timeout = 10  # Seconds to wait on each API call
+        # The context URL only varies by user, so build the rest once
+        self._url_tpl = f"{BASIC_TECH_API_BASE_URL}/project/{self.project_id}/user/{{uid}}/db/{self.table_id}"
+        # Pooled session so calls reuse one keep-alive TLS connection
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.session.mount('https://', HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=16,
+            max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=[502, 503, 504]),
+        ))
+        # httpx.AsyncClient per event loop for the a* methods, since a client's
+        # connection pool can only be used from the loop that created it
+        self._aclients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = weakref.WeakKeyDictionary()
+        # user_id -> (context, expires_at on the monotonic clock)
+        self._ctx_cache: Dict[str, Tuple[Dict[str, Any], float]] = {}
+        self._ttl = CONTEXT_CACHE_TTL
+        # user_id -> Future for a context GET already in progress
+        self._inflight: Dict[str, concurrent.futures.Future] = {}
+        # Guards _ctx_cache and _inflight, which callers and the writer
+        # thread share
+        self._lock = threading.Lock()
+        # Interactions waiting to be written, per user
+        self._pending: Dict[str, List[Dict[str, Any]]] = {}
+        # user_id -> monotonic time its oldest pending interaction was queued
+        self._pending_since: Dict[str, float] = {}
+        # Guards _pending; flushes are serialized separately so concurrent
+        # writers can't drop each other's interactions
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.RLock()
+        # (user_id, silent) batches written by the background writer thread
+        self._write_q: "queue.Queue[Tuple[str, bool]]" = queue.Queue()
+        threading.Thread(target=self._writer_loop, name="basic-tech-writer", daemon=True).start()
+        atexit.register(self.flush_all)
         if not self.api_key or not self.project_id:
             log.warning("Basic Tech API key or Project ID not set. User context storage will not function.")
+            # Without credentials every call is a no-op; bind stubs once
+            # instead of re-checking the credentials on every call
+            self.get_user_context = lambda user_id: None
+            self.update_user_context = lambda user_id, context_data, silent=False: False
+            self.add_interaction_to_context = lambda user_id, interaction, silent=False: False
+            self.aget_user_context = _async_none
+            self.aupdate_user_context = _async_false
+            self.aadd_interaction_to_context = _async_false
     
-    def _make_request(self, method: str, endpoint: str, data: Optional[Dict] = None, silent: bool = False) -> Optional[Dict]:
+    def _make_request(self, method: str, url: str, data: Optional[Dict] = None, silent: bool = False) -> Optional[Dict]:
         """Make a request to Basic Tech API."""
-        url = f"{BASIC_TECH_API_BASE_URL}/{endpoint}"
         try:
             if not silent:
-                log.info(f"Making {method} request to {url}")
-            response = requests.request(method, url, headers=self.headers, json=data, timeout=10)
+                log.opt(lazy=True).info("Making {} request to {}", lambda: method, lambda: url)
+            if method == 'GET':
+                response = self.session.get(url, timeout=self._timeout)
+            else:
+                body = _json_dumps(data) if data is not None else None
+                if method == 'POST':
+                    response = self.session.post(url, data=body, timeout=self._timeout)
+                else:
+                    response = self.session.request(method, url, data=body, timeout=self._timeout)
             response.raise_for_status()
-            return response.json()
+            return _json_loads(response.content)
         except requests.exceptions.HTTPError as e:
             if not silent:
-                if response.status_code == 500:
-                    log.error(f"Basic Tech API server error (500) - Table '{self.table_id}' may not exist in project")
-                    log.debug(f"Response content: {response.text[:200]}")
-                elif response.status_code == 404:
-                    log.error(f"Basic Tech API not found (404) - Check project ID and table name")
-                    log.debug(f"Response content: {response.text[:200]}")
-                else:
-                    log.error(f"HTTP error making request to Basic Tech API: {e}")
+                self._log_http_error(response, e)
             return None
         except requests.exceptions.RequestException as e:
             if not silent:
                 log.error(f"Error making request to Basic Tech API: {e}")
             return None
+        except ValueError as e:
+            if not silent:
+                log.error(f"Invalid JSON in Basic Tech API response: {e}")
+            return None
+    
+    def _log_http_error(self, response: Any, error: Exception) -> None:
+        """Log an error status returned by Basic Tech API."""
+        if response.status_code == 500:
+            log.error(f"Basic Tech API server error (500) - Table '{self.table_id}' may not exist in project")
+            log.opt(lazy=True).debug("Response content: {}", lambda: response.text[:200])
+        elif response.status_code == 404:
+            log.error(f"Basic Tech API not found (404) - Check project ID and table name")
+            log.opt(lazy=True).debug("Response content: {}", lambda: response.text[:200])
+        else:
+            log.error(f"HTTP error making request to Basic Tech API: {error}")
+    
+    def _cache_context(self, user_id: str, context_data: Dict[str, Any]) -> None:
+        """Remember a user's context for the next CONTEXT_CACHE_TTL seconds."""
+        entry = (copy.deepcopy(context_data), time.monotonic() + self._ttl)
+        with self._lock:
+            self._ctx_cache[user_id] = entry
     
     def get_user_context(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Retrieve user context from Basic Tech datastore."""
-        if not self.api_key or not self.project_id:
-            return None
+        # Make sure queued interactions are part of what we return
+        if user_id in self._pending:
+            self._flush(user_id, silent=True)
+        
+        # Serve recently fetched or written context without a round-trip
+        cached = self._cached_context(user_id)
+        if cached is not None:
+            return cached
+        
+        # Concurrent callers for the same user share a single GET
+        with self._lock:
+            future = self._inflight.get(user_id)
+            leader = future is None
+            if leader:
+                future = self._inflight[user_id] = concurrent.futures.Future()
         
+        if not leader:
+            return copy.deepcopy(future.result())
+        
+        try:
+            context_data = self._fetch_user_context(user_id)
+            future.set_result(context_data)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(user_id, None)
+        # Followers copy the published dict, so the leader gets its own copy too
+        return copy.deepcopy(context_data)
+    
+    def _fetch_user_context(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Fetch a user's context from the API, creating it if missing."""
         # Get all items from user's context table - use silent mode to suppress errors
-        endpoint = f"project/{self.project_id}/user/{user_id}/db/{self.table_id}"
-        result = self._make_request('GET', endpoint, silent=True)
+        url = self._url_tpl.format(uid=user_id)
+        result = self._make_request('GET', url, silent=True)
         
-        if result and 'data' in result and len(result['data']) > 0:
-            # Return the most recent context data
-            return result['data'][0].get('value', {})
-        elif result is None:
+        if result is None:
             # API call failed, might be due to missing table or user data
-            # Silently try to create an empty context
-            empty_context = {
-                "interactions": [],
-                "preferences": {},
-                "device_info": {},
-                "last_updated": time.strftime("%Y-%m-%d %H:%M:%S")
-            }
-            # Try to create context but don't show errors
-            self.update_user_context(user_id, empty_context, silent=True)
+            # Silently try to create an empty context, without showing errors
+            self.update_user_context(user_id, self._empty_context(), silent=True)
             return None
         
+        return self._context_from_result(user_id, result)
+    
+    def _cached_context(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the user's cached context if it hasn't expired."""
+        with self._lock:
+            cached = self._ctx_cache.get(user_id)
+        if cached is not None and time.monotonic() < cached[1]:
+            return copy.deepcopy(cached[0])
+        return None
+    
+    @staticmethod
+    def _empty_context() -> Dict[str, Any]:
+        """Build the context stored for a user we have no data for yet."""
+        return {
+            "interactions": [],
+            "preferences": {},
+            "device_info": {},
+            "last_updated": time.strftime("%Y-%m-%d %H:%M:%S")
+        }
+    
+    def _context_from_result(self, user_id: str, result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Extract and cache the most recent context from a GET response."""
+        if 'data' in result and len(result['data']) > 0:
+            # Return the most recent context data
+            context_data = result['data'][0].get('value', {})
+            self._cache_context(user_id, context_data)
+            return context_data
         return None
     
     def update_user_context(self, user_id: str, context_data: Dict[str, Any], silent: bool = False) -> bool:
         """Update user context in Basic Tech datastore."""
-        if not self.api_key or not self.project_id:
-            return False
-        
         # Create or update user context item
-        endpoint = f"project/{self.project_id}/user/{user_id}/db/{self.table_id}"
+        url = self._url_tpl.format(uid=user_id)
         payload = {"value": context_data}
         
-        result = self._make_request('POST', endpoint, payload, silent=silent)
+        result = self._make_request('POST', url, payload, silent=silent)
+        return self._record_update(user_id, context_data, result, silent)
+    
+    def _record_update(self, user_id: str, context_data: Dict[str, Any], result: Optional[Dict], silent: bool) -> bool:
+        """Update the local caches after writing a user's context."""
+        success = bool(result and 'data' in result)
+        if success:
+            self._cache_context(user_id, context_data)
+        else:
+            # Don't serve context we failed to write; re-read it next time
+            with self._lock:
+                self._ctx_cache.pop(user_id, None)
+        
         if result is None and not silent:
             log.warning(f"Failed to update user context. Table '{self.table_id}' may not exist in Basic Tech project.")
             return False
         
-        return bool(result and 'data' in result)
+        return success
     
     def add_interaction_to_context(self, user_id: str, interaction: Dict[str, Any], silent: bool = False) -> bool:
-        """Add a specific interaction to user context."""
-        if not self.api_key or not self.project_id:
-            return False
+        """Add a specific interaction to user context.
+        
+        Interactions are queued and written together by a background thread
+        once INTERACTION_BATCH_SIZE accumulate or INTERACTION_FLUSH_INTERVAL
+        has passed (and at exit), so callers never wait on the network.
+        
+        Returns:
+            True if the interaction was queued
+        """
+        with self._pending_lock:
+            pending = self._pending.setdefault(user_id, [])
+            pending.append(interaction)
+            since = self._pending_since.setdefault(user_id, time.monotonic())
+            due = (len(pending) >= INTERACTION_BATCH_SIZE
+                   or time.monotonic() - since > INTERACTION_FLUSH_INTERVAL)
+        
+        if due:
+            self._write_q.put((user_id, silent))
+        return True
+    
+    def _get_aclient(self) -> "httpx.AsyncClient":
+        """Get the pooled async HTTP client for the running event loop."""
+        if httpx is None:
+            raise ImportError("httpx is required for the async Basic Tech API methods")
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._aclients.get(loop)
+            if client is None:
+                client = self._aclients[loop] = httpx.AsyncClient(
+                    headers=self.headers,
+                    limits=httpx.Limits(max_connections=16, max_keepalive_connections=8),
+                    timeout=float(self._timeout),
+                )
+            return client
+    
+    async def _amake_request(self, method: str, url: str, data: Optional[Dict] = None, silent: bool = False) -> Optional[Dict]:
+        """Make a request to Basic Tech API without blocking the event loop."""
+        client = self._get_aclient()
+        try:
+            if not silent:
+                log.opt(lazy=True).info("Making {} request to {}", lambda: method, lambda: url)
+            body = _json_dumps(data) if data is not None else None
+            response = await client.request(method, url, content=body)
+            response.raise_for_status()
+            return _json_loads(response.content)
+        except httpx.HTTPStatusError as e:
+            if not silent:
+                self._log_http_error(e.response, e)
+            return None
+        except httpx.HTTPError as e:
+            if not silent:
+                log.error(f"Error making request to Basic Tech API: {e}")
+            return None
+        except ValueError as e:
+            if not silent:
+                log.error(f"Invalid JSON in Basic Tech API response: {e}")
+            return None
+    
+    async def aget_user_context(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Async version of get_user_context, for use inside an event loop."""
+        # Make sure queued interactions are part of what we return
+        if user_id in self._pending:
+            await asyncio.to_thread(self._flush, user_id, True)
+        
+        cached = self._cached_context(user_id)
+        if cached is not None:
+            return cached
+        
+        url = self._url_tpl.format(uid=user_id)
+        result = await self._amake_request('GET', url, silent=True)
+        
+        if result is None:
+            await self.aupdate_user_context(user_id, self._empty_context(), silent=True)
+            return None
+        
+        context_data = self._context_from_result(user_id, result)
+        return copy.deepcopy(context_data) if context_data is not None else None
+    
+    async def aupdate_user_context(self, user_id: str, context_data: Dict[str, Any], silent: bool = False) -> bool:
+        """Async version of update_user_context, for use inside an event loop."""
+        url = self._url_tpl.format(uid=user_id)
+        payload = {"value": context_data}
         
-        # Get current context (using silent mode to avoid error logs)
-        current_context = self.get_user_context(user_id) or {}
-        if 'interactions' not in current_context:
-            current_context['interactions'] = []
+        result = await self._amake_request('POST', url, payload, silent=silent)
+        return self._record_update(user_id, context_data, result, silent)
+    
+    async def aadd_interaction_to_context(self, user_id: str, interaction: Dict[str, Any], silent: bool = False) -> bool:
+        """Async version of add_interaction_to_context.
         
-        current_context['interactions'].append(interaction)
-        # Limit to last 10 interactions to prevent unlimited growth
-        current_context['interactions'] = current_context['interactions'][-10:]
-        # Update last_updated timestamp
-        current_context['last_updated'] = time.strftime("%Y-%m-%d %H:%M:%S")
+        Queuing never touches the network, so this simply defers to the
+        sync method.
+        """
+        return self.add_interaction_to_context(user_id, interaction, silent=silent)
+    
+    async def aclose(self) -> None:
+        """Close the async HTTP client of the running event loop, if one was created."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._aclients.pop(loop, None)
+        if client is not None:
+            await client.aclose()
+    
+    def _writer_loop(self) -> None:
+        """Write queued interaction batches off the caller's thread.
         
-        return self.update_user_context(user_id, current_context, silent=silent)
+        Also wakes up every INTERACTION_FLUSH_INTERVAL seconds to write any
+        batch that has been waiting longer than that, so interactions don't
+        sit in memory until another one arrives for the same user.
+        """
+        while True:
+            try:
+                user_id, silent = self._write_q.get(timeout=INTERACTION_FLUSH_INTERVAL)
+            except queue.Empty:
+                pass
+            else:
+                try:
+                    self._flush(user_id, silent=silent)
+                except Exception as e:
+                    log.error(f"Error writing user context: {e}")
+                finally:
+                    self._write_q.task_done()
+            
+            self._flush_stale()
+    
+    def _flush_stale(self) -> None:
+        """Write every pending batch older than INTERACTION_FLUSH_INTERVAL."""
+        cutoff = time.monotonic() - INTERACTION_FLUSH_INTERVAL
+        with self._pending_lock:
+            stale = [user_id for user_id, since in self._pending_since.items() if since <= cutoff]
+        for user_id in stale:
+            try:
+                self._flush(user_id, silent=True)
+            except Exception as e:
+                log.error(f"Error writing user context: {e}")
+    
+    def _flush(self, user_id: str, silent: bool = False) -> bool:
+        """Write a user's pending interactions in a single update."""
+        with self._flush_lock:
+            with self._pending_lock:
+                interactions = self._pending.pop(user_id, None)
+                self._pending_since.pop(user_id, None)
+            if not interactions:
+                return True
+            
+            # Get current context; a context fetched or written within the last
+            # CONTEXT_CACHE_TTL seconds is reused without a GET
+            current_context = self.get_user_context(user_id) or {}
+            
+            # Keep only the most recent interactions to prevent unlimited growth,
+            # trimming in place and only once the list actually overflows
+            stored = current_context.setdefault('interactions', [])
+            stored.extend(interactions)
+            if len(stored) > MAX_STORED_INTERACTIONS:
+                del stored[:-MAX_STORED_INTERACTIONS]
+            # Update last_updated timestamp
+            current_context['last_updated'] = time.strftime("%Y-%m-%d %H:%M:%S")
+            
+            return self.update_user_context(user_id, current_context, silent=silent)
+    
+    def flush_all(self) -> None:
+        """Wait for queued writes, then write all remaining pending interactions."""
+        self._write_q.join()
+        for user_id in list(self._pending):
+            self._flush(user_id, silent=True)
+
+@functools.lru_cache(maxsize=1)
+def get_client() -> BasicTechAPI:
+    """Get the process-wide Basic Tech API client.
+    
+    Returns:
+        The shared BasicTechAPI instance
+    """
+    return BasicTechAPI()
 
 # Initialize the API client
-basic_tech_client = BasicTechAPI()
+basic_tech_client = get_client()
@@ -6,6 +6,7 @@ Loads and manages configuration settings from environment variables and .env fil
 Provides a centralized way to access configuration values across the application.
 """
 
+import functools
 import os
 import sys
 from pathlib import Path
@@ -31,6 +32,8 @@ DEFAULT_CONFIG = {
     # Voice settings
     "VOICE_RATE": "175",  # Speech rate
     "VOICE_VOLUME": "0.9",  # Volume (0.0 to 1.0)
+    "VOICE_CHUNK_SIZE": "800",  # Mic frames per buffer (800 = 50 ms at 16 kHz)
+    "TTS_VOICE_ID": "",  # Optional pyttsx3 voice override (detected automatically if empty)
     
     # Logging settings
     "LOG_LEVEL": "INFO",
@@ -41,23 +44,30 @@ DEFAULT_CONFIG = {
     
     # Script execution settings
     "SCRIPT_TIMEOUT": "30",  # Seconds
+    
+    # Vision settings
+    "PROCESSED_IMAGE_FORMAT": "webp",  # webp or jpeg
+    "FIXER_WARMUP": "0",  # 1 to warm up the image pipeline at import
+    
+    # Gemini settings
+    "GEMINI_CACHE_ENABLED": "false",  # Explicit context caching of prompt templates
+    "GEMINI_CACHE_TTL": "3600",  # Seconds
+    
+    # Response cache settings
+    "MAX_CACHE_ENTRIES": "1024",  # Cached AI responses kept in memory
+    "RESPONSE_CACHE_TTL": "300",  # Seconds a cached response stays fresh (0 = forever)
+    "REDIS_URL": "",  # Optional, shares SMS cache/history across workers
 }
 
-# Global config cache
-_config_cache: Dict[str, Any] = {}
-
+@functools.lru_cache(maxsize=1)
 def load_config() -> Dict[str, Any]:
     """Load configuration from .env file and environment variables.
     
+    The result is computed once and cached for the life of the process.
+    
     Returns:
         Dict containing all configuration values
     """
-    global _config_cache
-    
-    # If config is already loaded, return the cached version
-    if _config_cache:
-        return _config_cache
-    
     # Load .env file if it exists
     env_path = Path(PROJECT_ROOT, ".env")
     if env_path.exists():
@@ -66,23 +76,21 @@ def load_config() -> Dict[str, Any]:
     # Start with default config
     config = DEFAULT_CONFIG.copy()
     
-    # Override with environment variables
-    for key in config.keys():
-        env_value = os.environ.get(key)
-        if env_value is not None:
-            config[key] = env_value
-    
-    # Cache the config
-    _config_cache = config
+    # Override with environment variables, snapshotted in a single pass
+    env = dict(os.environ)
+    config.update({key: env[key] for key in config if key in env})
     
     return config
 
+@functools.lru_cache(maxsize=None)
 def get_config(key: str, default: Any = None) -> Any:
     """Get a configuration value by key.
     
+    Lookups are memoized; set_config invalidates them.
+    
     Args:
         key: The configuration key to look up
-        default: Default value if key is not found
+        default: Default value if key is not found (must be hashable)
         
     Returns:
         The configuration value or default if not found
@@ -91,20 +99,15 @@ def get_config(key: str, default: Any = None) -> Any:
     return config.get(key, default)
 
 def set_config(key: str, value: Any) -> None:
-    """Set a configuration value (in memory only, not persisted).
+    """Set a configuration value.
     
     Args:
         key: The configuration key to set
         value: The value to set
     """
-    global _config_cache
-    
-    # Load config if not already loaded
-    if not _config_cache:
-        load_config()
-    
-    # Update the value
-    _config_cache[key] = value
+    # Update the value in the cached config and drop memoized lookups
+    load_config()[key] = value
+    get_config.cache_clear()
 
 def create_env_example() -> None:
     """Create a .env.example file with all required configuration keys."""
@@ -126,7 +129,9 @@ def create_env_example() -> None:
         
         f.write("# Voice settings\n")
         f.write("VOICE_RATE=175  # Speech rate\n")
-        f.write("VOICE_VOLUME=0.9  # Volume (0.0 to 1.0)\n\n")
+        f.write("VOICE_VOLUME=0.9  # Volume (0.0 to 1.0)\n")
+        f.write("VOICE_CHUNK_SIZE=800  # Microphone frames per buffer for Live API (800 = 50 ms at 16 kHz)\n")
+        f.write("TTS_VOICE_ID=  # Optional offline TTS voice ID (detected automatically if empty)\n\n")
         
         f.write("# Logging settings\n")
         f.write("LOG_LEVEL=INFO  # Logging level (DEBUG, INFO, WARNING, ERROR, CRITICAL)\n")
@@ -136,7 +141,20 @@ def create_env_example() -> None:
         f.write(f"TEMP_DIR={DEFAULT_CONFIG['TEMP_DIR']}  # Directory for temporary files\n\n")
         
         f.write("# Script execution settings\n")
-        f.write("SCRIPT_TIMEOUT=30  # Maximum execution time for scripts in seconds\n")
+        f.write("SCRIPT_TIMEOUT=30  # Maximum execution time for scripts in seconds\n\n")
+        
+        f.write("# Vision settings\n")
+        f.write("PROCESSED_IMAGE_FORMAT=webp  # Format for processed captures (webp or jpeg)\n")
+        f.write("FIXER_WARMUP=0  # Set to 1 to warm up the image pipeline in the background at startup\n\n")
+        
+        f.write("# Gemini settings\n")
+        f.write("GEMINI_CACHE_ENABLED=false  # Cache prompt templates with Gemini context caching\n")
+        f.write("GEMINI_CACHE_TTL=3600  # Lifetime of cached prompt templates in seconds\n\n")
+        
+        f.write("# Response cache settings\n")
+        f.write("MAX_CACHE_ENTRIES=1024  # Number of AI responses kept in memory\n")
+        f.write("RESPONSE_CACHE_TTL=300  # Seconds before a cached response is refreshed (0 = never)\n")
+        f.write("REDIS_URL=  # Optional, e.g. redis://localhost:6379/0 to share SMS cache and history\n")
 
 if __name__ == "__main__":
     # Create .env.example file when run directly
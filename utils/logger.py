@@ -6,8 +6,10 @@ Provides centralized logging functionality for the entire application.
 Configures loggers with appropriate handlers and formatters.
 """
 
+import atexit
 import os
 import sys
+import threading
 import logging
 from pathlib import Path
 from typing import Optional
@@ -16,13 +18,16 @@ from loguru import logger
 
 from utils import config
 
-# Create logs directory if it doesn't exist
+# Logs directory, created on first setup
 logs_dir = Path(__file__).parent.parent / "logs"
-logs_dir.mkdir(exist_ok=True)
 
 # Default log file path
 DEFAULT_LOG_FILE = str(logs_dir / "fixer.log")
 
+# Whether handlers have been configured; guarded by _SETUP_LOCK
+_configured = False
+_SETUP_LOCK = threading.RLock()
+
 # Configure Loguru logger
 def setup_logger(log_file: Optional[str] = None, log_level: str = "INFO") -> logger:
     """Set up and configure the logger.
@@ -34,6 +39,13 @@ def setup_logger(log_file: Optional[str] = None, log_level: str = "INFO") -> log
     Returns:
         Configured logger instance
     """
+    with _SETUP_LOCK:
+        return _configure(log_file, log_level)
+
+def _configure(log_file: Optional[str], log_level: Optional[str]) -> logger:
+    """Replace the Loguru handlers; must be called with _SETUP_LOCK held."""
+    global _configured
+    
     # Remove default handlers
     logger.remove()
     
@@ -53,7 +65,8 @@ def setup_logger(log_file: Optional[str] = None, log_level: str = "INFO") -> log
         sys.stderr,
         format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
         level=log_level,
-        colorize=True
+        colorize=True,
+        enqueue=True  # Write from a background thread
     )
     
     # Add file handler
@@ -63,9 +76,15 @@ def setup_logger(log_file: Optional[str] = None, log_level: str = "INFO") -> log
         level=log_level,
         rotation="10 MB",  # Rotate when file reaches 10 MB
         retention="1 week",  # Keep logs for 1 week
-        compression="zip"  # Compress rotated logs
+        compression="zip",  # Compress rotated logs
+        enqueue=True  # Write from a background thread
     )
     
+    # Drain queued records before the interpreter exits (registered once)
+    if not _configured:
+        atexit.register(logger.complete)
+    _configured = True
+    
     logger.info(f"Logger initialized with level {log_level}, logging to {log_file}")
     
     return logger
@@ -79,11 +98,13 @@ def get_logger(name: str) -> logger:
     Returns:
         Logger instance with the specified name
     """
+    # Configure on first use unless setup_logger was already called
+    if not _configured:
+        with _SETUP_LOCK:
+            if not _configured:
+                setup_logger()
     return logger.bind(name=name)
 
-# Initialize the logger when the module is imported
-_default_logger = setup_logger()
-
 if __name__ == "__main__":
     # Test the logger
     test_logger = get_logger("logger_test")
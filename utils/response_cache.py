@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Response Cache for Fixer AI
+
+Provides an in-memory LRU cache for structured AI responses.
+Repeated or near-identical questions are answered from memory instead of
+making another round-trip to the Gemini API.
+"""
+
+import copy
+import functools
+import hashlib
+import inspect
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from utils import config, logger
+
+# Initialize logger
+log = logger.get_logger(__name__)
+
+# xxhash is an optional, much faster non-cryptographic hash for cache keys
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+# Collapse runs of whitespace and drop trailing punctuation when normalizing
+_WHITESPACE_RE = re.compile(r"\s+")
+_TRAILING_PUNCT_RE = re.compile(r"[\s?!.,;:]+$")
+
+def normalize_text(text: str) -> str:
+    """Normalize text so trivially different phrasings share a cache entry.
+
+    Args:
+        text: The raw user input
+
+    Returns:
+        Lowercased text with collapsed whitespace and no trailing punctuation
+    """
+    text = _WHITESPACE_RE.sub(" ", text.strip().lower())
+    return _TRAILING_PUNCT_RE.sub("", text)
+
+def make_key(text: str) -> str:
+    """Build a cache key for a piece of user input.
+
+    Args:
+        text: The raw user input
+
+    Returns:
+        Hex digest of the normalized text (xxh3-64 if available, else sha256)
+    """
+    data = normalize_text(text).encode("utf-8")
+    if xxhash is not None:
+        return xxhash.xxh3_64_hexdigest(data)
+    return hashlib.sha256(data).hexdigest()
+
+class ResponseCache:
+    """Thread-safe LRU cache mapping user input to structured responses.
+
+    Entries older than ttl_seconds are treated as misses (0 disables expiry).
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, text: str) -> Optional[Dict[str, Any]]:
+        """Look up a cached response.
+
+        Args:
+            text: The user input
+
+        Returns:
+            A copy of the cached response, or None on a miss
+        """
+        key = make_key(text)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, result = entry
+            if self.ttl_seconds and time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        return copy.deepcopy(result)
+
+    def put(self, text: str, result: Dict[str, Any]) -> None:
+        """Store a response, evicting the least recently used entry if full.
+
+        Args:
+            text: The user input
+            result: The structured response to cache
+        """
+        key = make_key(text)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), copy.deepcopy(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove all cached responses."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+# Shared cache for AI responses
+response_cache = ResponseCache(
+    max_entries=int(config.get_config("MAX_CACHE_ENTRIES", "1024")),
+    ttl_seconds=float(config.get_config("RESPONSE_CACHE_TTL", "300")),
+)
+
+def cached_response(func: Callable[[str], Any]) -> Callable[[str], Any]:
+    """Decorator that serves repeated inputs from the shared response cache.
+
+    Works with both plain functions and coroutine functions. Only successful
+    responses (without an "error" key) are cached.
+
+    Args:
+        func: A function taking the user text and returning a response dict
+
+    Returns:
+        The wrapped function
+    """
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(text: str) -> Dict[str, Any]:
+            cached = response_cache.get(text)
+            if cached is not None:
+                log.info("Serving response from cache")
+                return cached
+
+            result = await func(text)
+            if "error" not in result:
+                response_cache.put(text, result)
+            return result
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(text: str) -> Dict[str, Any]:
+        cached = response_cache.get(text)
+        if cached is not None:
+            log.info("Serving response from cache")
+            return cached
+
+        result = func(text)
+        if "error" not in result:
+            response_cache.put(text, result)
+        return result
+
+    return wrapper